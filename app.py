@@ -10,6 +10,7 @@ from views import home, login, register, admin
 from views import public_profile, favorites_page, my_profile
 from views import product_detail, my_products
 from views import admin_stats, my_stats
+from views import directory
 from views import force_change_password
 from services.presence import heartbeat, online_count
 
@@ -140,6 +141,8 @@ def _sync_route_from_query_params():
     page = qp.get("page")
     if page:
         st.session_state["route"] = page
+        # ✅ se consume: si queda en la URL, goto() de la página destino no podría salir de ella
+        del qp["page"]
 
     spid = qp.get("selected_product_id")
     if spid:
@@ -175,6 +178,8 @@ def main():
         product_detail.render(db)
     elif route == "public_profile":
         public_profile.render(db)
+    elif route == "directory":
+        directory.render(db)
     elif route == "favorites":
         favorites_page.render(db)
     elif route == "my_profile":
@@ -35,6 +35,22 @@ def load_db() -> Dict[str, Any]:
         with open(DB_PATH, "r", encoding="utf-8") as f:
             return json.load(f)
 
+def catalog_version(db: Dict[str, Any]) -> str:
+    """Token de la última escritura del catálogo ("<n>-<id>"); "0" si nunca se escribió."""
+    return str((db.get("meta") or {}).get("catalog_version", 0) or 0)
+
+def bump_catalog_version(db: Dict[str, Any]) -> str:
+    """
+    Marca que cambió algo visible en el catálogo (productos/perfiles/dueños).
+    Cada escritura deja un token único: dos sesiones que guardan desde la misma
+    versión N no pueden quedar ambas en "N+1" (los índices y cachés por versión
+    verían la misma versión con distinto contenido).
+    """
+    meta = db.setdefault("meta", {})
+    n = int(catalog_version(db).split("-", 1)[0] or 0)
+    meta["catalog_version"] = f"{n + 1}-{uuid.uuid4().hex[:12]}"
+    return meta["catalog_version"]
+
 def save_db(db: Dict[str, Any]) -> None:
     ensure_dirs()
     with FileLock(DB_LOCK):
@@ -0,0 +1,141 @@
+# scripts/bench_sharded_search.py
+"""
+Benchmark: búsqueda de un solo hilo vs. top-k por shards (services/sharded_search.py).
+
+Arma un catálogo sintético en memoria (no toca data/db.json), construye el
+índice y mide search_ids y la primera página de search_page (la que usa el
+home) con distintas cantidades de workers.
+
+    python scripts/bench_sharded_search.py --n 200000 --workers 1 2 4
+
+Si la columna "speedup" no supera 1.0 en el servidor real, dejar
+SEARCH_WORKERS=1 (valor por defecto). Medido con 60k productos: 0.46x–1.11x
+con 2 y 4 workers (el puntaje es Python puro y los hilos comparten el GIL).
+Solo se miden casos con texto: sin texto / "Más recientes" lo resuelven las
+columnas (services/columnar.py) y nunca llegan a los shards.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import search_index, sharded_search  # noqa: E402
+from services.catalog import search_ids, search_page  # noqa: E402
+from services.query_cache import ORDER_CACHE  # noqa: E402
+from services.search_index import get_index  # noqa: E402
+
+# catálogo sintético: no pisar el snapshot del índice real en data/
+search_index.SNAPSHOT_PATH = None
+
+
+CATEGORIES = ["Comida", "Bebidas", "Moda", "Belleza", "Hogar", "Servicios", "Tecnología"]
+CITIES = ["Bogotá", "Medellín", "Cali", "Barranquilla", "Cartagena", "Bucaramanga", "Pereira", "Manizales"]
+WORDS = (
+    "galletas brownies tortas postres café chocolate jugos ropa bolsos accesorios "
+    "jabones velas decoración cocina limpieza mantenimiento tapetes pisos reparación "
+    "artesanal personalizado regalos eventos empresas domicilio saludable vegano "
+    "natural premium clásico mini grande familiar especial casero fresco"
+).split()
+
+
+def build_db(n: int, seed: int = 7) -> dict:
+    rnd = random.Random(seed)
+    n_profiles = max(1, n // 50)
+    users, profiles = [], []
+    for i in range(n_profiles):
+        users.append({"id": f"u{i}", "email": f"emp{i}@example.com", "role": "EMPRENDEDOR", "status": "ACTIVE"})
+        profiles.append({
+            "id": f"pf{i}",
+            "owner_user_id": f"u{i}",
+            "business_name": f"{rnd.choice(WORDS).capitalize()} {rnd.choice(WORDS)} {i}",
+            "city": rnd.choice(CITIES),
+            "is_approved": rnd.random() < 0.9,
+            "updated_at": "2026-01-01T00:00:00Z",
+        })
+
+    products = []
+    for i in range(n):
+        pf = rnd.randrange(n_profiles)
+        day = rnd.randrange(1, 28)
+        products.append({
+            "id": f"p{i}",
+            "profile_id": f"pf{pf}",
+            "owner_user_id": f"u{pf}",
+            "name": " ".join(rnd.choice(WORDS) for _ in range(3)).capitalize(),
+            "description": " ".join(rnd.choice(WORDS) for _ in range(20)),
+            "category": rnd.choice(CATEGORIES),
+            "tags": rnd.sample(WORDS, 3),
+            "status": "PUBLISHED" if rnd.random() < 0.95 else "DRAFT",
+            "price_value": rnd.randrange(1000, 500000, 500) if rnd.random() < 0.9 else None,
+            "created_at": f"2026-02-{day:02d}T{rnd.randrange(24):02d}:{rnd.randrange(60):02d}:00Z",
+        })
+    return {"meta": {"catalog_version": 1}, "users": users, "profiles": profiles, "products": products}
+
+
+def _time(fn, repeat: int) -> tuple[float, list]:
+    out, times = None, []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    db = build_db(args.n)
+    get_index(db)
+    print(f"catálogo: {args.n} productos, índice en {time.perf_counter() - t0:.1f}s, CPUs: {os.cpu_count()}")
+
+    cases = [
+        ("texto 1 término, top 9", "galletas", "Relevancia", 9),
+        ("texto 2 términos, top 9", "chocolate regalos", "Relevancia", 9),
+        ("texto 1 término, todo", "galletas", "Relevancia", None),
+    ]
+
+    # siempre por shards cuando workers > 1 (el umbral se mide acá)
+    sharded_search.SHARD_MIN_CANDIDATES = 0
+    print(f"{'caso':32} {'workers':>7} {'ms':>10} {'speedup':>8}  igual")
+    for label, q, sort_by, limit in cases:
+        base_ms, base_ids = None, None
+        for w in args.workers:
+            sharded_search.SEARCH_WORKERS = w
+            secs, ids = _time(
+                lambda: search_ids(db, q, "Todas", "Todas", "Todos", (0, 10**9), sort_by, limit=limit),
+                args.repeat,
+            )
+            ms = secs * 1000
+            if base_ms is None:
+                base_ms, base_ids = ms, ids
+            print(f"{label:32} {w:>7} {ms:>10.1f} {base_ms / ms:>8.2f}  {ids == base_ids}")
+
+    def _first_page(q: str) -> list[str]:
+        ORDER_CACHE.clear()  # medir el top-k, no el corte de un orden ya cacheado
+        return search_page(db, q, "Todas", "Todas", "Todos", (0, 10**9), "Relevancia")["ids"]
+
+    for q in ("galletas", "chocolate regalos"):
+        label = f"search_page «{q}», página 1"
+        base_ms, base_ids = None, None
+        for w in args.workers:
+            sharded_search.SEARCH_WORKERS = w
+            secs, ids = _time(lambda: _first_page(q), args.repeat)
+            ms = secs * 1000
+            if base_ms is None:
+                base_ms, base_ids = ms, ids
+            print(f"{label:32} {w:>7} {ms:>10.1f} {base_ms / ms:>8.2f}  {ids == base_ids}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ import re
 import uuid
 import streamlit as st
 
+from services import popularity, query_log, trending
+
 
 MAX_EVENTS = 5000
 
@@ -56,8 +58,23 @@ def track_event(
 
     Compat:
     - Guardamos `type` y también `event` con el mismo valor.
+
+    Además suma a los contadores con decaimiento, en O(1): popularidad de
+    productos (services/popularity.py, para el ranking) y tendencias de
+    productos/perfiles/búsquedas (services/trending.py); y el agregado de
+    búsquedas para sugerencias (services/query_log.py). Nadie recorre
+    db["events"] para eso. (Van antes del append: la migración inicial de
+    los contadores lee el historial sin este evento.)
     """
+    popularity.record_event(db, event_type, product_id)
+    trending.record_event(db, event_type, product_id=product_id, profile_id=profile_id, meta=meta)
+    query_log.record_event(db, event_type, meta)
+
     db.setdefault("events", [])
+    # contador monótono (db["events"] queda topado en MAX_EVENTS): lo usan quienes
+    # se refrescan "cada tantos eventos nuevos" (services/related.py)
+    meta_db = db.setdefault("meta", {})
+    meta_db["events_total"] = int(meta_db.get("events_total", len(db["events"])) or 0) + 1
     db["events"].append({
         "ts": _now_iso(),
         "type": event_type,   # ✅ recomendado para stats
@@ -0,0 +1,241 @@
+# services/autocomplete.py
+from __future__ import annotations
+
+from collections import Counter
+import heapq
+import threading
+
+from db.repo_json import catalog_version
+from services import query_log
+from services.search_index import locked_index
+from services.text import edit_distance, normalize_query, trigrams
+
+
+TOP_N = 8          # sugerencias precalculadas por prefijo
+MAX_PREFIX = 12    # prefijos más largos se resuelven filtrando el de 12
+QUERY_WEIGHT = 2   # cada vez que una búsqueda trajo resultados pesa como un tag
+SPELL_MIN_LEN = 4  # palabras más cortas no se corrigen
+
+
+def _prefix_top(entries: dict[str, tuple[str, int]]) -> dict[str, list[tuple[int, str, str]]]:
+    """
+    prefijo -> sus TOP_N mejores (peso, clave, texto), ya ordenadas. Prefijos
+    de la frase desde cada palabra ("brow" -> "Caja de brownies x6"), hasta
+    MAX_PREFIX caracteres.
+    """
+    buckets: dict[str, list[tuple[int, str, str]]] = {}
+    for key, (label, weight) in entries.items():
+        prefixes: set[str] = set()
+        words = key.split()
+        for i in range(len(words)):
+            rest = " ".join(words[i:])
+            for n in range(1, min(len(rest), MAX_PREFIX) + 1):
+                prefixes.add(rest[:n])
+        for pre in prefixes:
+            buckets.setdefault(pre, []).append((weight, key, label))
+    return {
+        pre: heapq.nlargest(TOP_N, items, key=lambda x: (x[0], -len(x[1])))
+        for pre, items in buckets.items()
+    }
+
+
+def _lookup(top: dict[str, list[tuple[int, str, str]]], q: str) -> list[tuple[int, str, str]]:
+    hits = top.get(q[:MAX_PREFIX]) or []
+    if len(q) > MAX_PREFIX:
+        hits = [h for h in hits if q in h[1]]
+    return hits
+
+
+class QuerySuggestions:
+    """
+    Búsquedas frecuentes que trajeron resultados (services/query_log.py),
+    con su propio mapa de prefijos. Son pocas (MAX_QUERIES): se re-arman
+    cada REBUILD_EVERY búsquedas sin tocar el modelo del catálogo.
+    """
+
+    def __init__(self, queries: dict[str, tuple[str, int]]) -> None:
+        self.queries = queries
+        self.top = _prefix_top({key: (label, QUERY_WEIGHT * hits) for key, (label, hits) in queries.items()})
+
+    def weight(self, key: str) -> int:
+        entry = self.queries.get(key)
+        return QUERY_WEIGHT * entry[1] if entry else 0
+
+
+class Autocomplete:
+    """
+    Autocompletado por prefijo para el buscador del home.
+
+    Fuentes: catálogo visible (nombres de producto, tags, categorías y
+    nombres de emprendimiento) + búsquedas frecuentes que trajeron
+    resultados (QuerySuggestions). Cada prefijo guarda sus TOP_N mejores
+    sugerencias ya ordenadas, así cada tecla es un lookup O(1) en un dict;
+    las del catálogo y las de búsquedas se suman al consultar.
+    """
+
+    def __init__(self, entries: dict[str, tuple[str, int]]) -> None:
+        # entries: clave normalizada -> (texto a mostrar, peso)
+        self.entries = entries
+        self.top = _prefix_top(entries)
+
+    def suggest(self, draft: str, n: int = 5, queries: QuerySuggestions | None = None) -> list[str]:
+        q = " ".join(normalize_query(draft).split())
+        if not q:
+            return []
+        merged: dict[str, tuple[int, str]] = {}
+        for weight, key, label in _lookup(self.top, q):
+            merged[key] = (weight + (queries.weight(key) if queries else 0), label)
+        if queries is not None:
+            for weight, key, label in _lookup(queries.top, q):
+                if key not in merged:
+                    prev = self.entries.get(key)
+                    merged[key] = ((prev[1] if prev else 0) + weight, prev[0] if prev else label)
+        ranked = sorted(merged.items(), key=lambda kv: (-kv[1][0], len(kv[0])))
+        return [label for key, (_, label) in ranked[:TOP_N] if key != q][:n]
+
+
+class Speller:
+    """
+    "¿Quisiste decir?" para búsquedas sin resultados: primero la búsqueda
+    frecuente más parecida (frase completa); si no hay, palabra por palabra
+    contra el vocabulario de sugerencias, con candidatos por trigramas
+    (mismo esquema que la búsqueda tolerante del índice).
+    """
+
+    def __init__(self, entries: dict[str, tuple[str, int]]) -> None:
+        self.words: Counter = Counter()
+        for key, (_, weight) in entries.items():
+            for w in key.split():
+                if len(w) >= SPELL_MIN_LEN and w.isalpha():
+                    self.words[w] += weight
+        self.grams: dict[str, set[str]] = {}
+        for w in self.words:
+            for g in trigrams(w):
+                self.grams.setdefault(g, set()).add(w)
+
+    @staticmethod
+    def _max_d(s: str) -> int:
+        return 1 if len(s) <= 6 else 2
+
+    def _closest_query(self, q: str, queries: dict[str, tuple[str, int]]) -> str | None:
+        max_d = self._max_d(q)
+        best = None
+        for key, (label, hits) in queries.items():
+            d = edit_distance(q, key, max_d)
+            if 0 < d <= max_d and (best is None or (d, -hits) < best[0]):
+                best = ((d, -hits), label)
+        return best[1] if best else None
+
+    def _closest_word(self, w: str) -> str:
+        if len(w) < SPELL_MIN_LEN or w in self.words:
+            return w
+        max_d = self._max_d(w)
+        grams = trigrams(w)
+        need = max(1, len(grams) - 3 * max_d)
+        shared: Counter = Counter()
+        for g in grams:
+            shared.update(self.grams.get(g, ()))
+        found = []
+        for cand, n in shared.items():
+            if n < need:
+                continue
+            d = edit_distance(w, cand, max_d)
+            if d <= max_d:
+                found.append((d, -self.words[cand], cand))
+        return min(found)[2] if found else w
+
+    def candidates(self, q: str, queries: dict[str, tuple[str, int]] | None = None) -> list[str]:
+        q = " ".join(normalize_query(q).split())
+        if not q:
+            return []
+        out: list[str] = []
+        phrase = self._closest_query(q, queries or {})
+        if phrase:
+            out.append(phrase)
+        fixed = " ".join(self._closest_word(w) for w in q.split())
+        if fixed != q:
+            out.append(fixed)
+        return out
+
+
+def _catalog_entries(db: dict) -> dict[str, tuple[str, int]]:
+    profiles_by_id = {p.get("id"): p for p in (db.get("profiles", []) or [])}
+
+    entries: dict[str, tuple[str, int]] = {}
+
+    def _add(label: str, weight: int) -> None:
+        label = " ".join((label or "").split())
+        key = normalize_query(label)
+        if not key:
+            return
+        prev = entries.get(key)
+        entries[key] = (prev[0] if prev else label, (prev[1] if prev else 0) + weight)
+
+    for p in db.get("products", []) or []:
+        if (p.get("status") or "").upper() != "PUBLISHED":
+            continue
+        prof = profiles_by_id.get(p.get("profile_id")) or {}
+        if not prof.get("is_approved", False):
+            continue
+
+        _add(p.get("name") or "", 1)
+        _add(p.get("category") or "", 2)
+        for t in p.get("tags") or []:
+            _add(t, 2)
+        _add(prof.get("business_name") or "", 1)
+
+    return entries
+
+
+def build_autocomplete(db: dict) -> tuple[Autocomplete, Speller]:
+    """Modelos del catálogo (caros: dependen solo de la versión de catálogo)."""
+    entries = _catalog_entries(db)
+    return Autocomplete(entries), Speller(entries)
+
+
+# Compartido entre sesiones. El catálogo (mapa de prefijos + Speller) se
+# re-arma solo si cambia la versión del catálogo; las búsquedas frecuentes,
+# cada REBUILD_EVERY búsquedas nuevas (son pocas, no bloquea a nadie).
+_CACHE: dict[str, object] = {"version": None, "ac": None, "speller": None, "generation": None, "queries": None}
+_LOCK = threading.Lock()
+
+
+def _models(db: dict) -> tuple[Autocomplete, Speller, QuerySuggestions]:
+    version = catalog_version(db)
+    gen = query_log.generation(db)
+    with _LOCK:
+        if _CACHE["version"] != version or _CACHE["ac"] is None:
+            _CACHE["ac"], _CACHE["speller"] = build_autocomplete(db)
+            _CACHE["version"] = version
+        if _CACHE["generation"] != gen or _CACHE["queries"] is None:
+            _CACHE["queries"] = QuerySuggestions(query_log.successful_queries(db))
+            _CACHE["generation"] = gen
+        return _CACHE["ac"], _CACHE["speller"], _CACHE["queries"]
+
+
+def get_autocomplete(db: dict) -> Autocomplete:
+    return _models(db)[0]
+
+
+def suggest(db: dict, draft: str, n: int = 5) -> list[str]:
+    """Sugerencias para el texto que el usuario está escribiendo (home)."""
+    ac, _, queries = _models(db)
+    return ac.suggest(draft, n=n, queries=queries)
+
+
+def did_you_mean(db: dict, q: str) -> str | None:
+    """
+    Corrección para una búsqueda sin resultados: la primera candidata que
+    sí encuentra productos visibles en el índice (o None).
+    """
+    _, speller, queries = _models(db)
+    cands = speller.candidates(q, queries.queries)
+    if not cands:
+        return None
+    with locked_index(db) as index:
+        visible = index.facets.visible()
+        for cand in cands:
+            ids = index.match(cand)
+            if ids and index.ids_to_mask(ids) & visible:
+                return cand
+    return None
@@ -2,38 +2,19 @@
 from __future__ import annotations
 
 from typing import Any
-import unicodedata
+import base64
+from bisect import bisect_left
+import json
+import threading
+import time
 
-
-def _norm_text(s: str) -> str:
-    """
-    Normaliza texto para búsquedas:
-    - lower()
-    - elimina tildes/diacríticos
-    - trim
-    """
-    s = (s or "").strip().lower()
-    s = "".join(
-        c for c in unicodedata.normalize("NFD", s)
-        if unicodedata.category(c) != "Mn"
-    )
-    return s
-
-
-def _match_query(haystack: str, needle: str) -> bool:
-    """
-    Match tolerante:
-    - ignora tildes y mayúsculas
-    - múltiples palabras (AND): todas deben aparecer
-    Ej: "café aurora" matchea "CAFE" y "Auróra"
-    """
-    n = _norm_text(needle)
-    if not n:
-        return True
-
-    h = _norm_text(haystack)
-    terms = [t for t in n.split() if t]
-    return all(t in h for t in terms)
+from db.repo_json import catalog_version
+from services.popularity import popularity_snapshot, snapshot_bucket
+from services.ranking import bm25_explain
+from services.query_cache import ORDER_CACHE, RESULTS_CACHE
+from services.query_parser import parse_query, resolve_filters
+from services.search_index import FUZZY_MIN_RESULTS, get_index, locked_index
+from services.sharded_search import sharded_keys, should_shard, top_keys
 
 
 def format_price(p: dict) -> str:
@@ -46,128 +27,430 @@ def format_price(p: dict) -> str:
     return f"${int(pv or 0):,}".replace(",", ".")
 
 
-def filter_products(
-    db: dict,
+def _stage(explain: dict | None, name: str, t0: float, mask: int) -> float:
+    """Anota una etapa (ms desde t0 + candidatos en `mask`) si hay explain; retorna el nuevo t0."""
+    now = time.perf_counter()
+    if explain is not None:
+        explain.setdefault("etapas", []).append({
+            "etapa": name,
+            "ms": round((now - t0) * 1000, 3),
+            "candidatos": mask.bit_count(),
+        })
+    return now
+
+
+def _candidate_mask(
+    index,
     q: str,
     category: str,
     city: str,
     tag: str,
-    price_range: tuple[int, int],
-    sort_by: str,
-) -> list[dict]:
+    price_range: tuple[int, int] | None = None,
+    skip: str = "",
+    explain: dict | None = None,
+) -> tuple[int, str]:
     """
-    Retorna productos publicados + _profile embebido.
-    Búsqueda avanzada (tildes/mayúsculas) aplicada a:
-    - name, description, category, tags
-    - business_name, city
-    - (opcional) email del dueño si existe en db["users"]
+    Máscara (bitset de ordinales) de productos visibles que cumplen los filtros
+    exactos, el precio y el texto. `skip` omite una dimensión (para contar sus
+    facetas). Retorna (máscara, query para ranking). Llamar con el índice bloqueado.
+    Con `explain`, anota tiempo y candidatos de cada etapa.
+
+    `q` acepta campos (services/query_parser.py): "categoria:Comida precio<30000
+    brownie". Se funden con los de la barra lateral ANTES de tocar índices, así
+    ambos caminos usan las mismas operaciones; solo el texto libre va al índice
+    invertido y al ranking.
     """
-    products = db.get("products", []) or []
-    profiles = db.get("profiles", []) or []
-    users = db.get("users", []) or []
+    t0 = time.perf_counter()
+    parsed = parse_query(q)
+    q = parsed.text.strip()
+    if explain is not None and parsed.has_fields():
+        explain["consulta"] = parsed.describe()
+
+    merged = resolve_filters(index.facets, parsed, category, city, tag, price_range, skip=skip)
+    conflict = merged["conflict"]
+    price_range = merged["price_range"]
+
+    want_cat = merged["category"] or "Todas"
+    want_city = merged["city"] or "Todas"
+    want_tag = merged["tag"] or "Todos"
+
+    if index.use_columnar():
+        # ----- catálogo grande: filtros vectorizados sobre columnas NumPy -----
+        cols = index.columns
+        mask = cols.to_bitmask(cols.select(
+            category=want_cat if want_cat != "Todas" and skip != "category" else None,
+            city=want_city if want_city != "Todas" and skip != "city" else None,
+            tag=want_tag if want_tag != "Todos" and skip != "tag" else None,
+            price_range=price_range,
+        ))
+        t0 = _stage(explain, "estado + facetas + precio (columnas)", t0, mask)
+    else:
+        facets = index.facets
+        mask = facets.visible()
+        t0 = _stage(explain, "estado / aprobación", t0, mask)
+
+        # ----- filtros exactos (categoría / ciudad) -----
+        if want_cat != "Todas" and skip != "category":
+            mask &= facets.mask("category", want_cat)
+        if want_city != "Todas" and skip != "city":
+            mask &= facets.mask("city", want_city)
+
+        # ----- filtro tag (normalizado) -----
+        if want_tag != "Todos" and skip != "tag":
+            mask &= facets.mask("tag", want_tag)
+        t0 = _stage(explain, "facetas (categoría / ciudad / tag)", t0, mask)
+
+        # ----- filtro precio (bisect sobre el índice ordenado) -----
+        # si price_type=AGREE (None), lo dejamos pasar
+        if price_range is not None:
+            pmask = index.price_mask(int(price_range[0]), int(price_range[1]))
+            if pmask is not None:
+                mask &= pmask
+        t0 = _stage(explain, "precio", t0, mask)
+
+    # campos que se contradicen (categoria:Comida + Hogar en la barra): nada que buscar
+    if conflict:
+        mask = 0
 
-    profiles_by_id = {p.get("id"): p for p in profiles}
-    users_by_id = {u.get("id"): u for u in users}
+    # ----- búsqueda avanzada (índice invertido) -----
+    rank_q = q
+    if q and mask:
+        text_ids = index.match(q)
+        # tolerancia a errores: solo si lo exacto trae pocos resultados
+        if text_ids is not None and len(text_ids) < FUZZY_MIN_RESULTS:
+            fuzzy_ids, variants = index.match_fuzzy(q)
+            if fuzzy_ids - text_ids:
+                text_ids = text_ids | fuzzy_ids
+                rank_q = " ".join([q, *variants])
+        if text_ids is not None:
+            mask &= index.ids_to_mask(text_ids)
+        t0 = _stage(explain, "texto (índice invertido)", t0, mask)
+        if explain is not None and rank_q != q:
+            explain["fuzzy"] = rank_q
 
+    return mask, rank_q
+
+
+def facet_counts(db: dict, q: str, category: str, city: str, tag: str) -> dict[str, dict[str, int]]:
+    """
+    Conteos tipo "Comida (124)" para la búsqueda actual, desde los bitsets.
+    Cada dimensión se cuenta con los demás filtros aplicados (no el suyo).
+    Tags quedan por clave normalizada (normalize_query).
+    """
     q = (q or "").strip()
-    want_cat = (category or "Todas")
-    want_city = (city or "Todas")
-    want_tag = (tag or "Todos")
+    out: dict[str, dict[str, int]] = {}
+    with locked_index(db) as index:
+        for dim in ("category", "city", "tag"):
+            base, _ = _candidate_mask(index, q, category, city, tag, skip=dim)
+            out[dim] = index.facets.counts(dim, base)
+    return out
 
-    pr_min, pr_max = price_range if price_range else (0, 10**9)
 
-    rows: list[dict] = []
+# Opciones de la barra lateral por versión de catálogo (iguales para todas las sesiones)
+_OPTIONS_CACHE: dict[str, Any] = {"version": None, "options": None}
+_OPTIONS_LOCK = threading.Lock()
+
 
-    for p in products:
+def _build_sidebar_options(db: dict) -> dict:
+    categories: set[str] = set()
+    tags: set[str] = set()
+    for p in db.get("products", []) or []:
         if (p.get("status") or "").upper() != "PUBLISHED":
             continue
+        cat = (p.get("category") or "").strip()
+        if cat:
+            categories.add(cat)
+        tags.update(t for t in (p.get("tags") or []) if (t or "").strip())
+    cities = {
+        pr.get("city", "") for pr in db.get("profiles", []) or []
+        if pr.get("is_approved") and pr.get("city")
+    }
+    with locked_index(db) as index:
+        prices = index.price_summary()
+    return {
+        "categories": sorted(categories),
+        "cities": sorted(cities),
+        "tags": sorted(tags),
+        "prices": prices,
+    }
 
-        prof = profiles_by_id.get(p.get("profile_id")) or {}
-        if not prof.get("is_approved", False):
-            # solo perfiles aprobados publican en el home
-            continue
 
-        # ----- filtros exactos (categoría / ciudad) -----
-        p_cat = p.get("category") or ""
-        if want_cat != "Todas" and p_cat != want_cat:
-            continue
+def sidebar_options(db: dict) -> dict:
+    """
+    Listas de la barra lateral del home {"categories", "cities", "tags", "prices"}.
+    Un solo recorrido por versión de catálogo: solo se rehace cuando una
+    escritura (services/mutations.py) sube la versión.
+    """
+    version = catalog_version(db)
+    with _OPTIONS_LOCK:
+        if _OPTIONS_CACHE["version"] != version or _OPTIONS_CACHE["options"] is None:
+            _OPTIONS_CACHE["options"] = _build_sidebar_options(db)
+            _OPTIONS_CACHE["version"] = version
+        return _OPTIONS_CACHE["options"]
 
-        prof_city = prof.get("city") or ""
-        if want_city != "Todas" and prof_city != want_city:
-            continue
 
-        # ----- filtro tag (normalizado) -----
-        p_tags = p.get("tags") or []
-        if want_tag != "Todos":
-            want_tag_n = _norm_text(want_tag)
-            tags_n = [_norm_text(t) for t in p_tags]
-            if want_tag_n not in tags_n:
-                continue
-
-        # ----- filtro precio -----
-        pv = p.get("price_value")
-        if isinstance(pv, (int, float)):
-            pv_i = int(pv)
-            if pv_i < int(pr_min) or pv_i > int(pr_max):
-                continue
-        # si price_type=AGREE (None), lo dejamos pasar
+def _explain_start(explain: dict | None, index, q: str, sort_by: str) -> float:
+    if explain is not None:
+        explain.update({"q": q, "orden": sort_by, "motor": "columnas" if index.use_columnar() else "bitsets"})
+    return time.perf_counter()
+
+
+def _explain_finish(
+    explain: dict | None,
+    index,
+    rank_q: str,
+    ids: list[str],
+    started: float,
+    popularity: dict[str, float] | None = None,
+) -> None:
+    """Total, cantidad y desglose BM25 (+ popularidad) de cada resultado entregado (con el índice bloqueado)."""
+    if explain is None:
+        return
+    explain["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    explain["resultados"] = len(ids)
+    if rank_q:
+        explain["puntajes"] = {pid: bm25_explain(index, rank_q, pid, popularity) for pid in ids}
 
-        # ----- búsqueda avanzada -----
-        if q:
-            owner = users_by_id.get(p.get("owner_user_id")) or {}
-            hay = " ".join([
-                p.get("name") or "",
-                p.get("description") or "",
-                p.get("category") or "",
-                " ".join(p_tags) if p_tags else "",
-                prof.get("business_name") or "",
-                prof.get("city") or "",
-                owner.get("email") or "",
-            ])
-            if not _match_query(hay, q):
-                continue
 
+def products_by_ids(db: dict, ids: list[str]) -> list[dict]:
+    """Materializa ids (en orden) como productos + _profile embebido."""
+    profiles_by_id = {p.get("id"): p for p in (db.get("profiles", []) or [])}
+    index = get_index(db)
+
+    rows: list[dict] = []
+    for pid in ids:
+        p = index.product_at(db, pid)
+        if not p:
+            continue
         # embebemos perfil (como ya usas en home)
         out = dict(p)
-        out["_profile"] = prof
+        out["_profile"] = profiles_by_id.get(p.get("profile_id")) or {}
         rows.append(out)
+    return rows
+
+
+def _encode_cursor(key: list) -> str:
+    raw = json.dumps(key, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str | None) -> list | None:
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except Exception:
+        return None
+    return key if isinstance(key, list) else None
 
-    # ----- orden -----
+
+def _ranked_keys(index, db: dict, rank_q: str, mask: int, popularity: dict[str, float] | None, limit: int | None) -> list[tuple]:
+    """
+    Claves de orden de los candidatos, de mejor a peor (ver
+    sharded_search.top_keys); con SEARCH_WORKERS > 1 y muchos candidatos,
+    por shards. Con `limit`, solo los `limit` mejores (heap).
+    """
+    if should_shard(mask):
+        return sharded_keys(index, db, rank_q, mask, limit, popularity=popularity)
+    return top_keys(index, db, rank_q, mask, limit, popularity)
+
+
+def _cut(keys: list[tuple], page_size: int | None) -> tuple[list[tuple], bool]:
+    """Primeras `page_size` claves (de mejor a peor) y si hay más."""
+    if page_size is None:
+        return keys, False
+    return keys[:page_size], len(keys) > page_size
+
+
+def search_page(
+    db: dict,
+    q: str,
+    category: str,
+    city: str,
+    tag: str,
+    price_range: tuple[int, int],
+    sort_by: str,
+    page_size: int | None = 9,
+    cursor: str | None = None,
+    explain: dict | None = None,
+) -> dict:
+    """
+    Una página de productos publicados que cumplen filtros/búsqueda, ya ordenados:
+    {"ids": [...], "total": n, "next_cursor": str | None}
+    (`page_size=None`: todos, sin cursor).
+
+    `q` puede traer filtros por campo ("categoria:Comida ciudad:Bogotá
+    precio<30000 tag:regalo brownie", ver services/query_parser.py): se
+    resuelven igual que los de la barra lateral.
+
+    El texto se resuelve con el índice invertido (services/search_index.py):
+    cada término de `q` es prefijo de alguna palabra indexada (AND).
+    Si hay menos de FUZZY_MIN_RESULTS, se suman coincidencias aproximadas
+    (trigramas + distancia de edición): "brownis" encuentra "brownies".
+    Estado, aprobación, categoría, ciudad y tag se resuelven como AND de
+    bitsets (services/facets.py). total = popcount de la máscara.
+
+    - Precio ↑/↓: se lee del índice de precios a partir del cursor
+      ("A convenir" al final).
+    - Más recientes / sin texto en catálogo grande: argsort en columnas
+      (services/columnar.py) de lo que queda después del cursor.
+    - Relevancia (BM25 × popularidad decaída, services/ranking.py y
+      services/popularity.py) / Más recientes: la primera página es un
+      top-k con heap (O(n log página)). Recién cuando un cursor pide la
+      segunda se ordena todo una vez; ese orden queda en ORDER_CACHE
+      (services/query_cache.py) y las siguientes solo cortan después del
+      cursor (clave de orden del último entregado): O(log n + página).
+
+    `explain` (dict, opcional) se completa con tiempos y candidatos por
+    etapa y el desglose BM25 de cada resultado (modo explain del home);
+    siempre recalcula, sin pasar por ORDER_CACHE.
+    """
+    q = (q or "").strip()
+    pr_min, pr_max = price_range if price_range else (0, 10**9)
     sort_by = (sort_by or "Relevancia").strip()
+    after = _decode_cursor(cursor)
+    want = None if page_size is None else page_size + 1
 
-    if sort_by == "Más recientes":
-        rows.sort(key=lambda x: x.get("updated_at") or x.get("created_at") or "", reverse=True)
-        return rows
-
-    if sort_by == "Precio ↑":
-        rows.sort(key=lambda x: int(x.get("price_value") or 10**18))
-        return rows
-
-    if sort_by == "Precio ↓":
-        rows.sort(key=lambda x: int(x.get("price_value") or 0), reverse=True)
-        return rows
-
-    # Relevancia (simple y efectiva):
-    # - si hay query, prioriza coincidencias en nombre y luego en descripción
-    if q:
-        terms = [t for t in _norm_text(q).split() if t]
-
-        def _score(x: dict) -> tuple[int, str]:
-            name = _norm_text(x.get("name") or "")
-            desc = _norm_text(x.get("description") or "")
-            # score más alto = mejor
-            s = 0
-            for t in terms:
-                if t in name:
-                    s += 5
-                if t in desc:
-                    s += 2
-            # desempate por reciente
-            ts = x.get("updated_at") or x.get("created_at") or ""
-            return (s, ts)
-
-        rows.sort(key=_score, reverse=True)
-    else:
-        rows.sort(key=lambda x: x.get("updated_at") or x.get("created_at") or "", reverse=True)
+    # mismo texto + filtros + orden en la misma versión: el orden ya calculado sirve
+    query_key = (catalog_version(db), snapshot_bucket(), q, category, city, tag, int(pr_min), int(pr_max), sort_by)
 
-    return rows
+    with locked_index(db) as index:
+        started = _explain_start(explain, index, q, sort_by)
+        # explain recalcula todas las etapas: ni lee ni llena ORDER_CACHE
+        cached = ORDER_CACHE.get(query_key) if explain is None else None
+        t0 = time.perf_counter()
+
+        if cached is None:
+            mask, rank_q = _candidate_mask(index, q, category, city, tag, (int(pr_min), int(pr_max)), explain=explain)
+            total = mask.bit_count()
+            t0 = time.perf_counter()
+
+            # ----- precio: streaming desde el índice ordenado -----
+            if sort_by in ("Precio ↑", "Precio ↓"):
+                ords = index.ords_by_price(
+                    mask,
+                    descending=(sort_by == "Precio ↓"),
+                    limit=want,
+                    after=(tuple(after) if after else None),
+                )
+                ords, more = _cut(ords, page_size)
+                next_cursor = _encode_cursor([index.price_of(ords[-1]), ords[-1]]) if more and ords else None
+                ids = [index.ord_pid[o] for o in ords]
+                _stage(explain, "orden por precio (índice)", t0, mask)
+                _explain_finish(explain, index, "", ids, started)
+                return {"ids": ids, "total": total, "next_cursor": next_cursor}
+
+            ranked = bool(rank_q) and sort_by != "Más recientes"
+            rank_q = rank_q if ranked else ""
+
+            # ----- recientes (y relevancia sin texto) en catálogo grande: argsort en columnas -----
+            if not ranked and index.use_columnar():
+                cols = index.columns
+                m = cols.from_bitmask(mask, cols.n)
+                if after is not None and len(after) == 2 and isinstance(after[0], int):
+                    m = cols.after_recent(m, after)
+                ords, more = _cut([int(o) for o in cols.order_recent(m, want)], page_size)
+                ids = [index.ord_pid[o] for o in ords]
+                _stage(explain, "orden por recientes (columnas)", t0, mask)
+                _explain_finish(explain, index, "", ids, started)
+                next_cursor = _encode_cursor(cols.recent_key(ords[-1])) if more and ords else None
+                return {"ids": ids, "total": total, "next_cursor": next_cursor}
+
+            pop = popularity_snapshot(db) if ranked else None
+
+            # ----- primera página: top-k con heap, sin ordenar todo -----
+            if after is None:
+                top, more = _cut(_ranked_keys(index, db, rank_q, mask, pop, want), page_size)
+                ids = [index.ord_pid[-k[-1]] for k in top]
+                _stage(explain, "puntaje BM25 + popularidad + top-k" if ranked else "orden por recientes (top-k)", t0, mask)
+                _explain_finish(explain, index, rank_q, ids, started, pop)
+                return {"ids": ids, "total": total, "next_cursor": _encode_cursor(list(top[-1])) if more and top else None}
+
+            # ----- "Cargar más": se ordena todo una vez (ascendente, para bisect) y se cachea -----
+            keys = _ranked_keys(index, db, rank_q, mask, pop, None)
+            keys.reverse()
+            cached = (total, rank_q, pop, keys)
+            if explain is None:
+                ORDER_CACHE.put(query_key, cached)
+            t0 = _stage(explain, "puntaje BM25 + popularidad + orden" if ranked else "orden por recientes", t0, mask)
+
+        # ----- corte: claves en orden ascendente, lo que va "después" del cursor es keys[:end] -----
+        total, rank_q, pop, keys = cached
+        if after is not None and keys and len(after) != len(keys[0]):
+            after = None  # cursor de otro orden (p. ej. de columnas): desde el principio
+        end = len(keys) if after is None else bisect_left(keys, tuple(after))
+        start = 0 if want is None else max(0, end - want)
+        top, more = _cut(keys[start:end][::-1], page_size)
+        ids = [index.ord_pid[-k[-1]] for k in top]
+        _stage(explain, "corte de página", t0, 0)
+        _explain_finish(explain, index, rank_q, ids, started, pop)
+
+    return {
+        "ids": ids,
+        "total": total,
+        "next_cursor": _encode_cursor(list(top[-1])) if more and top else None,
+    }
+
+
+def search_ids(
+    db: dict,
+    q: str,
+    category: str,
+    city: str,
+    tag: str,
+    price_range: tuple[int, int],
+    sort_by: str,
+    limit: int | None = None,
+    explain: dict | None = None,
+) -> list[str]:
+    """Ids de los `limit` primeros resultados (todos si es None): primera página de search_page."""
+    return search_page(db, q, category, city, tag, price_range, sort_by, page_size=limit, explain=explain)["ids"]
+
+
+def cached_search_page(
+    db: dict,
+    sig: str,
+    q: str,
+    category: str,
+    city: str,
+    tag: str,
+    price_range: tuple[int, int],
+    sort_by: str,
+    page_size: int = 9,
+    cursor: str | None = None,
+) -> dict:
+    """
+    search_page con caché LRU compartida (services/query_cache.py), clave =
+    (versión de catálogo, foto de popularidad, firma de filtros del home,
+    cursor, tamaño de página). Combinaciones populares ("Comida + Bogotá")
+    no vuelven a filtrar.
+    """
+    key = (catalog_version(db), snapshot_bucket(), sig, cursor or "", page_size)
+    return RESULTS_CACHE.get_or_compute(
+        key,
+        lambda: search_page(db, q, category, city, tag, price_range, sort_by, page_size=page_size, cursor=cursor),
+    )
+
+
+def filter_products(
+    db: dict,
+    q: str,
+    category: str,
+    city: str,
+    tag: str,
+    price_range: tuple[int, int],
+    sort_by: str,
+    limit: int | None = None,
+    explain: dict | None = None,
+) -> list[dict]:
+    """
+    Retorna productos publicados + _profile embebido.
+    Búsqueda avanzada (tildes/mayúsculas) aplicada a:
+    - name, description, category, tags
+    - business_name, city
+    - (opcional) email del dueño si existe en db["users"]
+
+    Ver search_ids para el detalle de índices y orden (y `explain`).
+    """
+    ids = search_ids(db, q, category, city, tag, price_range, sort_by, limit=limit, explain=explain)
+    return products_by_ids(db, ids)
@@ -0,0 +1,50 @@
+# services/change_events.py
+from __future__ import annotations
+
+import threading
+from typing import Callable
+
+
+# Tipos de evento que emite services/mutations.py
+PRODUCT_UPSERTED = "product_upserted"
+PRODUCT_DELETED = "product_deleted"
+PROFILE_UPDATED = "profile_updated"
+PROFILE_VISIBILITY_CHANGED = "profile_visibility_changed"
+USER_STATUS_CHANGED = "user_status_changed"
+
+EVENT_TYPES = (
+    PRODUCT_UPSERTED,
+    PRODUCT_DELETED,
+    PROFILE_UPDATED,
+    PROFILE_VISIBILITY_CHANGED,
+    USER_STATUS_CHANGED,
+)
+
+Handler = Callable[[dict, dict], None]
+
+_SUBSCRIBERS: dict[str, list[Handler]] = {}
+_LOCK = threading.Lock()
+
+
+def subscribe(event_type: str, handler: Handler) -> None:
+    """
+    Registra `handler(db, event)` para un tipo de evento ("*" = todos).
+    Los índices se suscriben al importarse; registrar dos veces no duplica.
+    """
+    if event_type != "*" and event_type not in EVENT_TYPES:
+        raise ValueError(f"Tipo de evento desconocido: {event_type}")
+    with _LOCK:
+        handlers = _SUBSCRIBERS.setdefault(event_type, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+
+def emit(db: dict, event: dict) -> None:
+    """
+    Entrega `event` a sus suscriptores, en el hilo de quien escribe.
+    event = {"type", "version", "prev_version", "product_ids", ...}
+    """
+    with _LOCK:
+        handlers = list(_SUBSCRIBERS.get(event["type"], [])) + list(_SUBSCRIBERS.get("*", []))
+    for handler in handlers:
+        handler(db, event)
@@ -0,0 +1,189 @@
+# services/columnar.py
+from __future__ import annotations
+
+from datetime import datetime
+
+try:  # opcional: sin numpy se usan solo los bitsets de services/facets.py
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+# Por debajo de esto los bitsets de Python son igual o más rápidos
+COLUMNAR_MIN_DOCS = 5000
+
+_STATUS_PUBLISHED = "PUBLISHED"
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _epoch(ts: str) -> int:
+    try:
+        return int(datetime.fromisoformat((ts or "").replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        return 0
+
+
+class ColumnStore:
+    """
+    Catálogo en columnas NumPy, una fila por ordinal del índice:
+    precio (NaN = "A convenir"), códigos de categoría/ciudad/estado,
+    aprobado, updated_at (epoch) y tags en formato CSR (indptr/indices).
+
+    Se actualiza fila a fila desde CatalogIndex.sync; el CSR de tags se
+    rearma solo cuando cambió algo (una vez por versión).
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.cap = 0
+        self.n = 0
+        self.cat_codes: dict[str, int] = {}
+        self.city_codes: dict[str, int] = {}
+        self.tag_codes: dict[str, int] = {}
+        self.status_codes: dict[str, int] = {}
+        self._row_tags: dict[int, list[int]] = {}
+        self._csr_dirty = True
+        self.tag_indptr = np.zeros(1, dtype=np.int64)
+        self.tag_indices = np.zeros(0, dtype=np.int32)
+        self._grow(capacity)
+
+    def _grow(self, cap: int) -> None:
+        def _resize(arr, fill, dtype):
+            out = np.full(cap, fill, dtype=dtype)
+            if arr is not None:
+                out[:len(arr)] = arr
+            return out
+
+        self.alive = _resize(getattr(self, "alive", None), False, np.bool_)
+        self.price = _resize(getattr(self, "price", None), np.nan, np.float64)
+        self.cat = _resize(getattr(self, "cat", None), -1, np.int32)
+        self.city = _resize(getattr(self, "city", None), -1, np.int32)
+        self.status = _resize(getattr(self, "status", None), -1, np.int16)
+        self.approved = _resize(getattr(self, "approved", None), False, np.bool_)
+        self.updated = _resize(getattr(self, "updated", None), 0, np.int64)
+        self.cap = cap
+
+    @staticmethod
+    def _code(codes: dict[str, int], value: str) -> int:
+        c = codes.get(value)
+        if c is None:
+            c = codes[value] = len(codes)
+        return c
+
+    def set_row(
+        self,
+        o: int,
+        *,
+        category: str,
+        city: str,
+        tags: list[str],
+        status: str,
+        approved: bool,
+        price,
+        updated_at: str,
+    ) -> None:
+        if o >= self.cap:
+            self._grow(max(o + 1, self.cap * 2))
+        self.n = max(self.n, o + 1)
+
+        self.alive[o] = True
+        self.price[o] = float(int(price)) if isinstance(price, (int, float)) else np.nan
+        self.cat[o] = self._code(self.cat_codes, category)
+        self.city[o] = self._code(self.city_codes, city)
+        self.status[o] = self._code(self.status_codes, status)
+        self.approved[o] = approved
+        self.updated[o] = _epoch(updated_at)
+        self._row_tags[o] = [self._code(self.tag_codes, t) for t in dict.fromkeys(tags)]
+        self._csr_dirty = True
+
+    def clear_row(self, o: int) -> None:
+        if o < self.cap:
+            self.alive[o] = False
+        if self._row_tags.pop(o, None) is not None:
+            self._csr_dirty = True
+
+    def _csr(self):
+        if self._csr_dirty:
+            counts = np.zeros(self.n, dtype=np.int64)
+            for o, codes in self._row_tags.items():
+                counts[o] = len(codes)
+            self.tag_indptr = np.concatenate(([0], np.cumsum(counts)))
+            flat = np.empty(int(self.tag_indptr[-1]), dtype=np.int32)
+            for o, codes in self._row_tags.items():
+                flat[self.tag_indptr[o]:self.tag_indptr[o + 1]] = codes
+            self.tag_indices = flat
+            self._csr_dirty = False
+        return self.tag_indptr, self.tag_indices
+
+    # ---------------------------
+    # Filtros / orden vectorizados
+    # ---------------------------
+    def select(
+        self,
+        *,
+        category: str | None = None,
+        city: str | None = None,
+        tag: str | None = None,
+        price_range: tuple[int, int] | None = None,
+    ):
+        """Máscara booleana (largo n) de visibles que cumplen los filtros."""
+        n = self.n
+        pub = self.status_codes.get(_STATUS_PUBLISHED, -2)
+        m = self.alive[:n] & self.approved[:n] & (self.status[:n] == pub)
+
+        if category is not None:
+            m &= self.cat[:n] == self.cat_codes.get(category, -2)
+        if city is not None:
+            m &= self.city[:n] == self.city_codes.get(city, -2)
+        if tag is not None:
+            code = self.tag_codes.get(tag, -2)
+            indptr, indices = self._csr()
+            has = np.zeros(n, dtype=np.bool_)
+            rows = np.repeat(np.arange(n), np.diff(indptr))
+            has[rows[indices == code]] = True
+            m &= has
+        if price_range is not None:
+            lo, hi = price_range
+            pr = self.price[:n]
+            with np.errstate(invalid="ignore"):
+                m &= np.isnan(pr) | ((pr >= lo) & (pr <= hi))
+        return m
+
+    @staticmethod
+    def to_bitmask(m) -> int:
+        """Máscara booleana -> bitset (int de Python) sin loop en Python."""
+        if not len(m):
+            return 0
+        return int.from_bytes(np.packbits(m, bitorder="little").tobytes(), "little")
+
+    @staticmethod
+    def from_bitmask(mask: int, n: int):
+        nbytes = (n + 7) // 8
+        raw = np.frombuffer(mask.to_bytes(max(nbytes, (mask.bit_length() + 7) // 8), "little"), dtype=np.uint8)
+        return np.unpackbits(raw, bitorder="little")[:n].astype(np.bool_)
+
+    def recent_key(self, o: int) -> list[int]:
+        """Clave de orden de order_recent para el ordinal `o` (cursor de "Cargar más")."""
+        return [int(self.updated[o]), -int(o)]
+
+    def after_recent(self, m, key):
+        """Deja en `m` solo lo que order_recent pone después de `key` = [epoch, -ordinal]."""
+        epoch, neg_o = int(key[0]), int(key[1])
+        n = len(m)
+        upd = self.updated[:n]
+        return m & ((upd < epoch) | ((upd == epoch) & (np.arange(n) > -neg_o)))
+
+    def order_recent(self, m, limit: int | None = None):
+        """Ordinales de `m` por updated_at desc (empate: ordinal asc), vía argsort."""
+        ords = np.flatnonzero(m)
+        keys = self.updated[ords]
+        if limit is not None and limit < len(ords):
+            # solo los `limit` más recientes: argpartition + orden del tramo
+            cut = np.partition(keys, len(keys) - limit)[len(keys) - limit]
+            ords = ords[keys >= cut]
+            keys = self.updated[ords]
+        order = np.lexsort((ords, -keys))
+        ords = ords[order]
+        return ords[:limit] if limit is not None else ords
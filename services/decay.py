@@ -0,0 +1,55 @@
+# services/decay.py
+from __future__ import annotations
+
+from datetime import datetime
+import heapq
+import math
+
+
+# Contadores con decaimiento exponencial, guardados compactos en db:
+#   store[clave] = [valor, epoch_de_la_última_actualización]
+# Sumar un evento es O(1) (se decae lo acumulado hasta ahora y se suma);
+# leer aplica el decaimiento hasta `now` sin tocar lo guardado.
+
+
+def decayed(entry, now: float, half_life_s: float) -> float:
+    if not entry:
+        return 0.0
+    value, ts = entry[0], entry[1]
+    dt = max(0.0, now - ts)
+    return value * math.pow(2.0, -dt / half_life_s)
+
+
+def bump(store: dict, key: str, weight: float, now: float, half_life_s: float) -> float:
+    """Suma `weight` al contador de `key` (decayendo lo anterior). Retorna el nuevo valor."""
+    value = decayed(store.get(key), now, half_life_s) + weight
+    store[key] = [round(value, 4), int(now)]
+    return value
+
+
+def top_n(store: dict, n: int, now: float, half_life_s: float) -> list[tuple[str, float]]:
+    """Los `n` mayores (valor decaído a `now`) con un heap de tamaño n."""
+    return heapq.nlargest(
+        n,
+        ((k, decayed(e, now, half_life_s)) for k, e in store.items()),
+        key=lambda kv: kv[1],
+    )
+
+
+def prune(store: dict, now: float, half_life_s: float, max_keys: int, min_value: float = 0.01) -> None:
+    """Acota el tamaño: quita lo que ya decayó a ~0 y, si sobra, lo más bajo."""
+    dead = [k for k, e in store.items() if decayed(e, now, half_life_s) < min_value]
+    for k in dead:
+        store.pop(k, None)
+    if len(store) > max_keys:
+        keep = {k for k, _ in top_n(store, max_keys, now, half_life_s)}
+        for k in [k for k in store if k not in keep]:
+            store.pop(k, None)
+
+
+def event_epoch(ts: str) -> float | None:
+    """Fecha ISO de un evento (db["events"][i]["ts"]) -> epoch; None si no se entiende."""
+    try:
+        return datetime.fromisoformat((ts or "").replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
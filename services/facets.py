@@ -0,0 +1,84 @@
+# services/facets.py
+from __future__ import annotations
+
+
+DIMENSIONS = ("category", "city", "tag", "status")
+
+
+def ords_to_mask(ords) -> int:
+    """
+    Bitset con los bits `ords` en 1. Marca los bits en un bytearray y
+    convierte una sola vez: `m |= 1 << o` copia el entero entero en cada paso.
+    """
+    ords = list(ords)
+    if not ords:
+        return 0
+    buf = bytearray((max(ords) >> 3) + 1)
+    for o in ords:
+        buf[o >> 3] |= 1 << (o & 7)
+    return int.from_bytes(buf, "little")
+
+
+def mask_to_ords(mask: int) -> list[int]:
+    """Posiciones de los bits en 1 (en orden ascendente)."""
+    bits = bin(mask)[:1:-1]  # invertido, sin "0b": bits[i] = bit i
+    out: list[int] = []
+    i = bits.find("1")
+    while i != -1:
+        out.append(i)
+        i = bits.find("1", i + 1)
+    return out
+
+
+class FacetIndex:
+    """
+    Bitsets (enteros de Python) por valor de faceta: el bit `o` está en 1 si el
+    producto con ordinal `o` tiene ese valor.
+
+    - Filtrar = AND de bitsets (categoría & ciudad & tag & visibles).
+    - Contar  = popcount(bitset & máscara actual), sin recorrer productos.
+    """
+
+    def __init__(self) -> None:
+        self.bits: dict[str, dict[str, int]] = {d: {} for d in DIMENSIONS}
+        self.approved = 0
+        self._doc_keys: dict[int, list[tuple[str, str]]] = {}
+
+    def add(self, o: int, values: dict[str, list[str]], approved: bool) -> None:
+        bit = 1 << o
+        keys: list[tuple[str, str]] = []
+        for dim in DIMENSIONS:
+            for v in dict.fromkeys(values.get(dim) or []):
+                by_val = self.bits[dim]
+                by_val[v] = by_val.get(v, 0) | bit
+                keys.append((dim, v))
+        if approved:
+            self.approved |= bit
+        self._doc_keys[o] = keys
+
+    def remove(self, o: int) -> None:
+        bit = 1 << o
+        for dim, v in self._doc_keys.pop(o, []):
+            by_val = self.bits[dim]
+            m = by_val.get(v, 0) & ~bit
+            if m:
+                by_val[v] = m
+            else:
+                by_val.pop(v, None)
+        self.approved &= ~bit
+
+    def mask(self, dim: str, value: str) -> int:
+        return self.bits[dim].get(value, 0)
+
+    def visible(self) -> int:
+        """Publicados de perfiles aprobados (lo que se ve en el home)."""
+        return self.mask("status", "PUBLISHED") & self.approved
+
+    def counts(self, dim: str, base: int) -> dict[str, int]:
+        """Cuántos de `base` caen en cada valor de `dim` (solo valores > 0)."""
+        out: dict[str, int] = {}
+        for v, m in self.bits[dim].items():
+            n = (m & base).bit_count()
+            if n:
+                out[v] = n
+        return out
@@ -0,0 +1,176 @@
+# services/mutations.py
+# Único camino de escritura del catálogo (productos / perfiles / estado de usuarios).
+#
+# Cada función muta `db`, sube la versión de catálogo y emite un evento tipado
+# (services/change_events.py) con los productos afectados; los índices
+# suscritos se actualizan solo para esos productos. Guardar sigue siendo
+# responsabilidad de la vista (save_db), para poder agrupar varias mutaciones.
+from __future__ import annotations
+
+from db.repo_json import bump_catalog_version, catalog_version, new_id, now_iso
+from services import change_events as ev
+from services.search_index import product_search_norm, profile_search_norm
+
+
+def public_ids(db: dict, product_ids) -> set[str]:
+    """
+    Cuáles de `product_ids` se ven en público: publicado, perfil aprobado y
+    dueño activo (mismo criterio que product_detail._is_public_allowed).
+    """
+    ids = set(product_ids or [])
+    if not ids:
+        return set()
+    profiles_by_id = {x.get("id"): x for x in (db.get("profiles", []) or [])}
+    users_by_id = {u.get("id"): u for u in (db.get("users", []) or [])}
+    out: set[str] = set()
+    for p in db.get("products", []) or []:
+        if p.get("id") not in ids or (p.get("status") or "").upper() != "PUBLISHED":
+            continue
+        if not (profiles_by_id.get(p.get("profile_id")) or {}).get("is_approved"):
+            continue
+        owner = users_by_id.get(p.get("owner_user_id"))
+        if owner and (owner.get("status") or "").upper() != "ACTIVE":
+            continue
+        out.add(p["id"])
+    return out
+
+
+def _commit(db: dict, event_type: str, product_ids: list[str], was_public: set[str] | None = None, **extra) -> dict:
+    """
+    Sube la versión y emite el evento. `was_public` = public_ids() antes de
+    mutar: el evento lleva en "became_public" los productos que recién se
+    hicieron visibles (lo único que debe avisar a búsquedas guardadas).
+    """
+    prev = catalog_version(db)
+    version = bump_catalog_version(db)
+    # ✅ cada documento tocado lleva el token de su escritura: la firma de los
+    # índices lo compara, así dos escrituras en el mismo segundo no se confunden
+    touched = set(product_ids)
+    for p in db.get("products", []) or []:
+        if p.get("id") in touched:
+            p["catalog_rev"] = version
+    if extra.get("profile_id"):
+        for prof in db.get("profiles", []) or []:
+            if prof.get("id") == extra["profile_id"]:
+                prof["catalog_rev"] = version
+    event = {
+        "type": event_type,
+        "prev_version": prev,
+        "version": version,
+        "product_ids": product_ids,
+        "became_public": sorted(public_ids(db, product_ids) - (was_public or set())),
+        **extra,
+    }
+    ev.emit(db, event)
+    return event
+
+
+def _profile_product_ids(db: dict, profile_id: str | None) -> list[str]:
+    return [p.get("id") for p in (db.get("products", []) or []) if p.get("profile_id") == profile_id and p.get("id")]
+
+
+def _owner_product_ids(db: dict, user_id: str | None) -> list[str]:
+    return [p.get("id") for p in (db.get("products", []) or []) if p.get("owner_user_id") == user_id and p.get("id")]
+
+
+# ---------------------------
+# Productos
+# ---------------------------
+def save_product(
+    db: dict,
+    payload: dict,
+    item: dict | None = None,
+    *,
+    owner_user_id: str | None = None,
+    profile_id: str | None = None,
+) -> dict:
+    """Crea (item=None) o actualiza un producto con `payload`. Retorna el producto."""
+    now = now_iso()
+    payload = {**payload, "updated_at": payload.get("updated_at") or now}
+    # ✅ formas normalizadas para búsqueda (se calculan una sola vez, al guardar)
+    payload["search_norm"] = product_search_norm(payload)
+
+    was_public = public_ids(db, [item.get("id")]) if item is not None else set()
+    if item is not None:
+        item.update(payload)
+        product = item
+    else:
+        product = {
+            "id": new_id(),
+            "owner_user_id": owner_user_id,
+            "profile_id": profile_id,
+            "created_at": now,
+            **payload,
+        }
+        db.setdefault("products", []).append(product)
+
+    _commit(db, ev.PRODUCT_UPSERTED, [product["id"]], was_public)
+    return product
+
+
+def update_product(db: dict, product: dict, changes: dict) -> dict:
+    """Cambios puntuales (estado, tag_suggestion, ...) + updated_at."""
+    was_public = public_ids(db, [product.get("id")])
+    product.update(changes)
+    if {"name", "description", "category", "tags"} & set(changes):
+        product["search_norm"] = product_search_norm(product)
+    product["updated_at"] = now_iso()
+    _commit(db, ev.PRODUCT_UPSERTED, [product.get("id")], was_public)
+    return product
+
+
+def set_product_status(db: dict, product: dict, status: str) -> dict:
+    return update_product(db, product, {"status": status})
+
+
+def delete_product(db: dict, product_id: str) -> None:
+    db["products"] = [x for x in (db.get("products", []) or []) if x.get("id") != product_id]
+    _commit(db, ev.PRODUCT_DELETED, [product_id])
+
+
+# ---------------------------
+# Perfiles
+# ---------------------------
+def create_profile(db: dict, prof: dict) -> dict:
+    prof["search_norm"] = profile_search_norm(prof)
+    db.setdefault("profiles", []).append(prof)
+    _commit(db, ev.PROFILE_UPDATED, _profile_product_ids(db, prof.get("id")), profile_id=prof.get("id"))
+    return prof
+
+
+def update_profile(db: dict, prof: dict, changes: dict) -> dict:
+    """Datos del perfil (nombre, ciudad, imágenes, links...) + updated_at."""
+    was_public = public_ids(db, _profile_product_ids(db, prof.get("id")))
+    prof.update(changes)
+    prof["search_norm"] = profile_search_norm(prof)
+    prof["updated_at"] = now_iso()
+    _commit(db, ev.PROFILE_UPDATED, _profile_product_ids(db, prof.get("id")), was_public, profile_id=prof.get("id"))
+    return prof
+
+
+def set_profile_approval(db: dict, prof: dict, approved: bool) -> dict:
+    """Aprobar / dejar pendiente: cambia la visibilidad de todos sus productos."""
+    was_public = public_ids(db, _profile_product_ids(db, prof.get("id")))
+    prof["is_approved"] = bool(approved)
+    prof["updated_at"] = now_iso()
+    _commit(
+        db,
+        ev.PROFILE_VISIBILITY_CHANGED,
+        _profile_product_ids(db, prof.get("id")),
+        was_public,
+        profile_id=prof.get("id"),
+        approved=bool(approved),
+    )
+    return prof
+
+
+# ---------------------------
+# Usuarios
+# ---------------------------
+def set_user_status(db: dict, user: dict, status: str) -> dict:
+    product_ids = _owner_product_ids(db, user.get("id"))
+    was_public = public_ids(db, product_ids)
+    user["status"] = status
+    user["updated_at"] = now_iso()
+    _commit(db, ev.USER_STATUS_CHANGED, product_ids, was_public, user_id=user.get("id"), status=status)
+    return user
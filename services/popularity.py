@@ -0,0 +1,88 @@
+# services/popularity.py
+from __future__ import annotations
+
+import math
+import threading
+import time
+
+from services.decay import bump, decayed, event_epoch, prune
+
+
+HALF_LIFE_S = 14 * 24 * 3600   # una vista de hace 2 semanas vale la mitad
+VIEW_WEIGHT = 1.0              # view_product
+CONTACT_WEIGHT = 3.0           # click_* (whatsapp / instagram / call): intención más fuerte
+MAX_KEYS = 20000               # tope de productos con contador en db.json
+POPULARITY_WEIGHT = 0.15       # relevancia final = BM25 * (1 + w * log1p(popularidad))
+SNAPSHOT_EVERY_S = 300         # el ranking usa una foto de los contadores (estable entre páginas)
+
+
+def _store(db: dict) -> dict:
+    return db.setdefault("popularity", {})
+
+
+def event_weight(event_type: str) -> float:
+    if event_type == "view_product":
+        return VIEW_WEIGHT
+    if (event_type or "").startswith("click_"):
+        return CONTACT_WEIGHT
+    return 0.0
+
+
+def record_event(db: dict, event_type: str, product_id: str | None, now: float | None = None) -> None:
+    """Lo llama track_event: O(1) por evento, nunca se recorre db["events"]."""
+    weight = event_weight(event_type)
+    if not weight or not product_id:
+        return
+    backfill(db)
+    now = time.time() if now is None else now
+    store = _store(db)
+    bump(store, product_id, weight, now, HALF_LIFE_S)
+    if len(store) > MAX_KEYS:
+        prune(store, now, HALF_LIFE_S, MAX_KEYS)
+
+
+def backfill(db: dict) -> None:
+    """
+    Migración única: bases anteriores a los contadores los arman desde el
+    historial de eventos que ya existe (db["events"], con su fecha real).
+    """
+    if "popularity" in db:
+        return
+    _store(db)
+    for e in db.get("events", []) or []:
+        when = event_epoch(e.get("ts"))
+        if when is not None:
+            record_event(db, e.get("type") or e.get("event") or "", e.get("product_id"), now=when)
+
+
+def boost(popularity: float) -> float:
+    return 1.0 + POPULARITY_WEIGHT * math.log1p(max(0.0, popularity))
+
+
+# Foto compartida de popularidad decaída (se renueva cada SNAPSHOT_EVERY_S)
+_SNAP: dict[str, object] = {"bucket": None, "values": {}}
+_LOCK = threading.Lock()
+
+
+def snapshot_bucket(now: float | None = None) -> int:
+    """Identifica la foto vigente (va en la clave de la caché de resultados)."""
+    now = time.time() if now is None else now
+    return int(now // SNAPSHOT_EVERY_S)
+
+
+def popularity_snapshot(db: dict) -> dict[str, float]:
+    """
+    pid -> popularidad decaída al inicio del intervalo actual. Mientras no cambie
+    el intervalo, todas las páginas de una búsqueda ven los mismos valores.
+    """
+    bucket = snapshot_bucket()
+    with _LOCK:
+        if _SNAP["bucket"] == bucket:
+            return _SNAP["values"]
+    backfill(db)
+    at = bucket * SNAPSHOT_EVERY_S
+    values = {pid: decayed(e, at, HALF_LIFE_S) for pid, e in (db.get("popularity") or {}).items()}
+    with _LOCK:
+        _SNAP["bucket"] = bucket
+        _SNAP["values"] = values
+    return values
@@ -0,0 +1,272 @@
+# services/profile_index.py
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+import threading
+
+from db.repo_json import catalog_version
+from services import change_events
+from services.facets import FacetIndex, mask_to_ords, ords_to_mask
+from services.text import analyze_normalized, normalize_query
+
+
+# Directorio de emprendimientos: índice propio sobre los perfiles (no sobre productos).
+# Campos con peso para ordenar por relevancia (nombre > categorías > ciudad > descripción)
+FIELD_WEIGHTS: dict[str, float] = {
+    "business_name": 3.0,
+    "categories": 2.0,
+    "city": 1.5,
+    "short_desc": 1.0,
+}
+
+
+def _profile_norm(prof: dict) -> dict:
+    stored = prof.get("search_norm") or {}
+    return {
+        "business_name": stored.get("business_name") or normalize_query(prof.get("business_name") or ""),
+        "city": stored.get("city") or normalize_query(prof.get("city") or ""),
+        "short_desc": normalize_query(prof.get("short_desc") or ""),
+        "categories": " ".join(normalize_query(c) for c in (prof.get("categories") or [])),
+    }
+
+
+class ProfileIndex:
+    """
+    Índice invertido + facetas (categorías, ciudad) de los perfiles.
+    Mismo esquema que CatalogIndex, en chico:
+    - postings token -> ids, vocabulario ordenado para prefijos ("cafe" -> "cafeteria")
+    - bitsets por faceta (services/facets.py) y bit de aprobados
+    - sync por firma (updated_at, aprobación) o apply_changes por perfil
+    """
+
+    def __init__(self) -> None:
+        self.version: str | None = None
+        self.postings: dict[str, set[str]] = {}
+        self.doc_tokens: dict[str, set[str]] = {}
+        self.doc_tf: dict[str, dict[str, Counter]] = {}
+        self.doc_sig: dict[str, tuple] = {}
+        self.doc_name: dict[str, str] = {}
+        self.doc_created: dict[str, str] = {}
+        self._vocab: list[str] | None = None
+        self.doc_ord: dict[str, int] = {}
+        self.ord_pid: list[str | None] = []
+        self._free_ords: list[int] = []
+        self.facets = FacetIndex()
+
+    # ---------------------------
+    # Mantenimiento
+    # ---------------------------
+    @staticmethod
+    def _signature(prof: dict) -> tuple:
+        return (
+            prof.get("updated_at") or prof.get("created_at") or "",
+            prof.get("catalog_rev") or "",
+            bool(prof.get("is_approved", False)),
+        )
+
+    def _ordinal(self, pid: str) -> int:
+        o = self.doc_ord.get(pid)
+        if o is None:
+            if self._free_ords:
+                o = self._free_ords.pop()
+                self.ord_pid[o] = pid
+            else:
+                o = len(self.ord_pid)
+                self.ord_pid.append(pid)
+            self.doc_ord[pid] = o
+        return o
+
+    def _remove(self, pid: str) -> None:
+        o = self.doc_ord.get(pid)
+        if o is not None:
+            self.facets.remove(o)
+        for t in self.doc_tokens.pop(pid, set()):
+            ids = self.postings.get(t)
+            if ids is None:
+                continue
+            ids.discard(pid)
+            if not ids:
+                del self.postings[t]
+                self._vocab = None
+        self.doc_tf.pop(pid, None)
+        self.doc_sig.pop(pid, None)
+        self.doc_name.pop(pid, None)
+        self.doc_created.pop(pid, None)
+
+    def _release(self, pid: str) -> None:
+        self._remove(pid)
+        o = self.doc_ord.pop(pid, None)
+        if o is not None:
+            self.ord_pid[o] = None
+            self._free_ords.append(o)
+
+    def _index_profile(self, prof: dict) -> None:
+        pid = prof["id"]
+        self._remove(pid)
+        norm = _profile_norm(prof)
+        tf = {f: Counter(analyze_normalized(norm[f])) for f in FIELD_WEIGHTS}
+        tokens = set().union(*tf.values())
+        self.doc_tf[pid] = tf
+        self.doc_tokens[pid] = tokens
+        for t in tokens:
+            ids = self.postings.get(t)
+            if ids is None:
+                self.postings[t] = {pid}
+                self._vocab = None
+            else:
+                ids.add(pid)
+
+        o = self._ordinal(pid)
+        self.facets.add(
+            o,
+            {"category": [c for c in (prof.get("categories") or []) if c], "city": [prof.get("city") or ""]},
+            bool(prof.get("is_approved", False)),
+        )
+        self.doc_sig[pid] = self._signature(prof)
+        self.doc_name[pid] = norm["business_name"]
+        self.doc_created[pid] = prof.get("created_at") or ""
+
+    def sync(self, db: dict) -> int:
+        """Re-indexa solo perfiles nuevos/cambiados (firma) y quita los borrados."""
+        version = catalog_version(db)
+        if self.version == version:
+            return 0
+        changed = 0
+        seen: set[str] = set()
+        for prof in db.get("profiles", []) or []:
+            pid = prof.get("id")
+            if not pid:
+                continue
+            seen.add(pid)
+            if self.doc_sig.get(pid) != self._signature(prof):
+                self._index_profile(prof)
+                changed += 1
+        for pid in [x for x in self.doc_ord if x not in seen]:
+            self._release(pid)
+            changed += 1
+        self.version = version
+        return changed
+
+    def apply_changes(self, db: dict, profile_id: str | None, prev_version: str) -> int:
+        """
+        Evento de services/mutations.py: re-indexa solo `profile_id` (o sync
+        completo si se perdió algún cambio). Eventos sin perfil (productos)
+        solo avanzan la versión.
+        """
+        if self.version != prev_version:
+            self.version = None  # fuerza la comparación de firmas (sync sale temprano si la versión coincide)
+            return self.sync(db)
+        if not profile_id:
+            self.version = catalog_version(db)
+            return 0
+        prof = next((p for p in (db.get("profiles", []) or []) if p.get("id") == profile_id), None)
+        if prof is None:
+            self._release(profile_id)
+        else:
+            self._index_profile(prof)
+        self.version = catalog_version(db)
+        return 1
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def _term_ids(self, term: str) -> set[str]:
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        vocab = self._vocab
+        i = bisect_left(vocab, term)
+        out: set[str] = set()
+        while i < len(vocab) and vocab[i].startswith(term):
+            out |= self.postings[vocab[i]]
+            i += 1
+        return out
+
+    def candidate_mask(self, q: str, category: str, city: str, skip: str = "") -> int:
+        """Aprobados & categoría & ciudad & todos los términos de `q` (prefijo)."""
+        mask = self.facets.approved
+        if category and category != "Todas" and skip != "category":
+            mask &= self.facets.mask("category", category)
+        if city and city != "Todas" and skip != "city":
+            mask &= self.facets.mask("city", city)
+        for t in dict.fromkeys(analyze_normalized(normalize_query(q))):
+            if not mask:
+                break
+            ids = self._term_ids(t)
+            mask &= ords_to_mask(self.doc_ord[pid] for pid in ids if pid in self.doc_ord)
+        return mask
+
+    def score(self, pid: str, terms: list[str]) -> float:
+        tf = self.doc_tf.get(pid) or {}
+        s = 0.0
+        for t in terms:
+            s += max(
+                (FIELD_WEIGHTS[f] * c for f, counts in tf.items() for w, c in counts.items() if w.startswith(t)),
+                default=0.0,
+            )
+        return s
+
+    def mask_to_ids(self, mask: int) -> list[str]:
+        return [self.ord_pid[o] for o in mask_to_ords(mask) if self.ord_pid[o]]
+
+
+# Índice compartido por todas las sesiones del proceso
+_INDEX = ProfileIndex()
+_LOCK = threading.Lock()
+
+
+def _on_profile_change(db: dict, event: dict) -> None:
+    """Suscriptor: perfiles editados/aprobados (views/my_profile.py, admin) sin re-escanear todo."""
+    with _LOCK:
+        _INDEX.apply_changes(db, event.get("profile_id"), event.get("prev_version"))
+
+
+for _event_type in change_events.EVENT_TYPES:
+    change_events.subscribe(_event_type, _on_profile_change)
+
+
+SORTS = ("Relevancia", "Nombre A-Z", "Más recientes")
+
+
+def profile_facet_counts(db: dict, q: str, category: str, city: str) -> dict[str, dict[str, int]]:
+    """Conteos "Comida (12)" del directorio: cada dimensión con los demás filtros aplicados."""
+    q = (q or "").strip()
+    with _LOCK:
+        _INDEX.sync(db)
+        return {
+            dim: _INDEX.facets.counts(dim, _INDEX.candidate_mask(q, category, city, skip=dim))
+            for dim in ("category", "city")
+        }
+
+
+def search_profiles(
+    db: dict,
+    q: str = "",
+    category: str = "Todas",
+    city: str = "Todas",
+    sort_by: str = "Relevancia",
+    page: int = 1,
+    page_size: int = 12,
+) -> dict:
+    """
+    Una página del directorio (perfiles aprobados): {"ids", "total", "page", "pages"}.
+    Filtros = AND de bitsets + postings por prefijo; solo se ordena lo que pasó el filtro.
+    """
+    q = (q or "").strip()
+    with _LOCK:
+        _INDEX.sync(db)
+        index = _INDEX
+        ids = index.mask_to_ids(index.candidate_mask(q, category, city))
+        terms = list(dict.fromkeys(analyze_normalized(normalize_query(q))))
+        if sort_by == "Más recientes":
+            ids.sort(key=lambda pid: index.doc_created.get(pid, ""), reverse=True)
+        elif sort_by == "Relevancia" and terms:
+            ids.sort(key=lambda pid: (-index.score(pid, terms), index.doc_name.get(pid, "")))
+        else:
+            ids.sort(key=lambda pid: index.doc_name.get(pid, ""))
+
+    total = len(ids)
+    pages = max(1, -(-total // page_size))
+    page = min(max(1, int(page)), pages)
+    start = (page - 1) * page_size
+    return {"ids": ids[start:start + page_size], "total": total, "page": page, "pages": pages}
@@ -0,0 +1,69 @@
+# services/query_cache.py
+from __future__ import annotations
+
+from collections import OrderedDict
+import threading
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:
+    """
+    Caché LRU acotada y thread-safe (compartida entre sesiones del proceso).
+    - get_or_compute: si no está, calcula FUERA del lock y guarda.
+    - hits / misses para ver si vale la pena.
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+
+# Ids de resultados del home por (versión de catálogo, firma de filtros)
+RESULTS_CACHE = LRUCache(maxsize=256)
+
+# Orden completo de una búsqueda (claves ordenadas) por (versión, popularidad,
+# texto, filtros, orden): "Cargar más" solo corta, no vuelve a filtrar ni puntuar.
+# Pocas entradas: cada una guarda una clave por candidato.
+ORDER_CACHE = LRUCache(maxsize=8)
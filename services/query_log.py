@@ -0,0 +1,83 @@
+# services/query_log.py
+from __future__ import annotations
+
+from services.trending import query_key
+
+
+# Agregado en línea de las búsquedas (evento "search" de log_search):
+# db["query_log"] = {"n": búsquedas vistas, "queries": {q_norm: [texto, búsquedas, con_resultados]}}
+# Se actualiza en track_event (O(1)); el autocompletado y el "¿quisiste decir?"
+# leen este resumen, nunca db["events"].
+MAX_QUERIES = 2000
+MIN_QUERY_LEN = 2
+REBUILD_EVERY = 20   # el modelo de sugerencias se re-arma cada tantas búsquedas nuevas
+
+
+def _log(db: dict) -> dict:
+    log = db.setdefault("query_log", {})
+    log.setdefault("n", 0)
+    log.setdefault("queries", {})
+    return log
+
+
+def _prune(queries: dict) -> None:
+    """Se queda con el 90% más útil (con resultados, luego más buscadas)."""
+    keep = sorted(queries.items(), key=lambda kv: (kv[1][2], kv[1][1]), reverse=True)[: int(MAX_QUERIES * 0.9)]
+    queries.clear()
+    queries.update(keep)
+
+
+def record_search(db: dict, q: str, results_n: int | None) -> None:
+    """Suma una búsqueda (ya sanitizada por log_search) al agregado."""
+    label = " ".join((q or "").split())
+    key = query_key(label)
+    if len(key) < MIN_QUERY_LEN or "<email>" in key or "<phone>" in key:
+        return
+    log = _log(db)
+    log["n"] += 1
+    entry = log["queries"].get(key)
+    if entry is None:
+        # se poda ANTES de insertar: la búsqueda nueva (0 resultados aún) no puede ser la podada
+        if len(log["queries"]) >= MAX_QUERIES:
+            _prune(log["queries"])
+        entry = log["queries"][key] = [label, 0, 0]
+    entry[0] = label  # la forma más reciente es la que se muestra
+    entry[1] += 1
+    if results_n:
+        entry[2] += 1
+
+
+def record_event(db: dict, event_type: str, meta: dict | None = None) -> None:
+    """Lo llama track_event; solo le interesan los eventos "search"."""
+    if event_type != "search":
+        return
+    backfill(db)
+    meta = meta or {}
+    record_search(db, meta.get("q") or "", meta.get("results_n"))
+
+
+def backfill(db: dict) -> None:
+    """Migración única desde el historial de eventos (bases anteriores al agregado)."""
+    if "query_log" in db:
+        return
+    _log(db)
+    for e in db.get("events", []) or []:
+        if (e.get("type") or e.get("event")) == "search":
+            meta = e.get("meta") or {}
+            record_search(db, meta.get("q") or "", meta.get("results_n"))
+
+
+def generation(db: dict) -> int:
+    """Cambia cada REBUILD_EVERY búsquedas (va en la clave del modelo de sugerencias)."""
+    backfill(db)
+    return int(_log(db)["n"]) // REBUILD_EVERY
+
+
+def successful_queries(db: dict, min_hits: int = 2) -> dict[str, tuple[str, int]]:
+    """q_norm -> (texto, veces que trajo resultados), solo las que lo hicieron `min_hits`+ veces."""
+    backfill(db)
+    return {
+        key: (label, hits)
+        for key, (label, _, hits) in _log(db)["queries"].items()
+        if hits >= min_hits
+    }
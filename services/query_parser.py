@@ -0,0 +1,152 @@
+# services/query_parser.py
+from __future__ import annotations
+
+import re
+
+from services.text import normalize_query
+
+
+# Campos que entiende el buscador del home (con y sin tilde, español/inglés):
+#   categoria:Comida  ciudad:"La estrella"  tag:regalo  precio<30000  precio:10000-50000
+FIELD_ALIASES: dict[str, str] = {
+    "categoria": "category",
+    "category": "category",
+    "cat": "category",
+    "ciudad": "city",
+    "city": "city",
+    "tag": "tag",
+    "tags": "tag",
+    "etiqueta": "tag",
+    "precio": "price",
+    "price": "price",
+}
+PRICE_MAX = 10**9
+
+_CLAUSE_RE = re.compile(r'(\w+)(<=|>=|<|>|:|=)("[^"]*"|\S+)')
+_TOKEN_RE = re.compile(r'[^\s"]*"[^"]*"|\S+')
+_NUM_RE = re.compile(r"\d[\d.,]*")
+
+
+def _number(s: str) -> int | None:
+    """Precio escrito como 30000, 30.000 o 30,000 -> 30000 (pesos, sin decimales)."""
+    if not _NUM_RE.fullmatch(s or ""):
+        return None
+    return int(re.sub(r"[.,]", "", s))
+
+
+def _price_range(op: str, value: str) -> tuple[int, int] | None:
+    if op in (":", "=") and "-" in value:
+        lo_s, _, hi_s = value.partition("-")
+        lo, hi = _number(lo_s) if lo_s else 0, _number(hi_s) if hi_s else PRICE_MAX
+        return (lo, hi) if lo is not None and hi is not None else None
+    n = _number(value)
+    if n is None:
+        return None
+    return {
+        "<": (0, n - 1),
+        "<=": (0, n),
+        ">": (n + 1, PRICE_MAX),
+        ">=": (n, PRICE_MAX),
+        ":": (n, n),
+        "=": (n, n),
+    }[op]
+
+
+class ParsedQuery:
+    """
+    Búsqueda del home separada en texto libre + filtros por campo.
+    Los filtros se aplican con los mismos índices que la barra lateral
+    (services/catalog.py::_candidate_mask), así "categoria:Comida" y elegir
+    "Comida" en el selector dan exactamente lo mismo.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.fields: dict[str, list[str]] = {"category": [], "city": [], "tag": []}
+        self.price: tuple[int, int] | None = None
+
+    def has_fields(self) -> bool:
+        return self.price is not None or any(self.fields.values())
+
+    def describe(self) -> dict:
+        """Para el modo explain."""
+        out: dict = {k: v for k, v in self.fields.items() if v}
+        if self.price is not None:
+            out["price"] = list(self.price)
+        out["texto"] = self.text
+        return out
+
+
+def parse_query(q: str) -> ParsedQuery:
+    """
+    `categoria:Comida ciudad:Bogotá precio<30000 tag:regalo brownie`
+    -> filtros {category, city, tag, price} + texto "brownie".
+    Lo que no es una cláusula válida (campo desconocido, precio ilegible)
+    queda como texto. Varias cláusulas del mismo campo se combinan con AND.
+    """
+    parsed = ParsedQuery()
+    words: list[str] = []
+    for token in _TOKEN_RE.findall(q or ""):
+        m = _CLAUSE_RE.fullmatch(token)
+        field = FIELD_ALIASES.get(normalize_query(m.group(1))) if m else None
+        if not field:
+            words.append(token)
+            continue
+
+        op, value = m.group(2), m.group(3).strip('"').strip()
+        if field == "price":
+            rng = _price_range(op, value)
+            if rng is None:
+                words.append(token)
+                continue
+            lo, hi = parsed.price or (0, PRICE_MAX)
+            parsed.price = (max(lo, rng[0]), min(hi, rng[1]))
+        elif op == ":" and value:
+            parsed.fields[field].append(value)
+        else:
+            words.append(token)
+
+    parsed.text = " ".join(words)
+    return parsed
+
+
+def facet_key(facets, dim: str, value: str) -> str:
+    """
+    Valor tal como lo guarda la faceta (services/facets.py): tags normalizados;
+    categoría y ciudad con su forma original ("bogota" -> "Bogotá").
+    """
+    if dim == "tag":
+        return normalize_query(value)
+    want = normalize_query(value)
+    for v in facets.bits[dim]:
+        if normalize_query(v) == want:
+            return v
+    return value
+
+
+def resolve_filters(
+    facets,
+    parsed: ParsedQuery,
+    category: str,
+    city: str,
+    tag: str,
+    price_range: tuple[int, int] | None,
+    skip: str = "",
+) -> dict:
+    """
+    Funde los campos de la consulta con los de la barra lateral:
+    {"category", "city", "tag": valor de faceta | None, "price_range", "conflict"}.
+    conflict=True si una dimensión pide dos valores distintos (no hay resultados).
+    `skip` ignora una dimensión (conteos de facetas).
+    """
+    out: dict = {"conflict": False}
+    for dim, side, default in (("category", category, "Todas"), ("city", city, "Todas"), ("tag", tag, "Todos")):
+        wanted = [] if skip == dim else parsed.fields[dim] + ([side] if side and side != default else [])
+        values = {facet_key(facets, dim, v) for v in wanted}
+        out["conflict"] |= len(values) > 1
+        out[dim] = values.pop() if len(values) == 1 else None
+    if parsed.price is not None:
+        lo, hi = price_range if price_range is not None else (0, PRICE_MAX)
+        price_range = (max(int(lo), parsed.price[0]), min(int(hi), parsed.price[1]))
+    out["price_range"] = price_range
+    return out
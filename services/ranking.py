@@ -0,0 +1,139 @@
+# services/ranking.py
+from __future__ import annotations
+
+import math
+
+from services.popularity import boost
+from services.search_index import CatalogIndex, tokenize
+
+
+# Peso de cada campo en BM25F (nombre > tags > emprendimiento > descripción)
+FIELD_WEIGHTS: dict[str, float] = {
+    "name": 3.0,
+    "tags": 2.0,
+    "business_name": 1.5,
+    "description": 1.0,
+}
+K1 = 1.2
+B = 0.75
+PREFIX_SCAN_MIN = 32   # desde cuántas expansiones conviene recorrer los tokens del documento
+
+
+def _idf(index: CatalogIndex, token: str) -> float:
+    n = index.n_docs
+    df = len(index.postings.get(token) or ())
+    return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+
+def _prefix_wtf(tf: dict, norm: dict[str, float], term: str) -> dict[str, float]:
+    """
+    Frecuencia ponderada (suma de campos) de cada token DEL DOCUMENTO que
+    empieza por `term`. Recorre los pocos tokens del documento en vez de
+    todas las expansiones del vocabulario ("c" -> miles de palabras).
+    """
+    out: dict[str, float] = {}
+    for f, weight in FIELD_WEIGHTS.items():
+        for w, c in (tf.get(f) or {}).items():
+            if c and w.startswith(term):
+                out[w] = out.get(w, 0.0) + weight * c / norm[f]
+    return out
+
+
+def bm25_scores(index: CatalogIndex, q: str, ids, popularity: dict[str, float] | None = None) -> dict[str, float]:
+    """
+    Puntaje BM25F de cada id para `q`, usando las frecuencias/longitudes
+    precalculadas en el índice (no re-normaliza texto).
+    - Cada término de `q` se expande por prefijo ("brown" -> "brownies")
+      y cuenta la mejor expansión (no se suman variantes del mismo término).
+      Si el prefijo abre muchas palabras (PREFIX_SCAN_MIN), se miran solo
+      los tokens de cada documento que empiezan por él.
+    - `popularity` (pid -> vistas/contactos decaídos, services/popularity.py)
+      multiplica el puntaje por 1 + w·log1p(pop): desempata y sube lo que la
+      gente mira, sin que un producto sin coincidencia de texto gane puntos.
+    """
+    terms = list(dict.fromkeys(tokenize(q)))
+    expanded: list[list[tuple[str, float]] | None] = []
+    for t in terms:
+        words = index.expand_prefix(t)
+        expanded.append([(w, _idf(index, w)) for w in words] if len(words) < PREFIX_SCAN_MIN else None)
+    idf_cache: dict[str, float] = {}
+    avg = {f: index.avg_field_len(f) for f in FIELD_WEIGHTS}
+
+    scores: dict[str, float] = {}
+    for pid in ids:
+        tf = index.doc_tf.get(pid)
+        lens = index.doc_len.get(pid)
+        if not tf:
+            scores[pid] = 0.0
+            continue
+
+        # normalización de longitud por campo (una vez por documento)
+        norm = {
+            f: (1.0 - B + B * lens[f] / avg[f]) if avg[f] else 1.0
+            for f in FIELD_WEIGHTS
+        }
+
+        s = 0.0
+        for t, variants in zip(terms, expanded):
+            best = 0.0
+            if variants is None:
+                for w, wtf in _prefix_wtf(tf, norm, t).items():
+                    idf = idf_cache.get(w)
+                    if idf is None:
+                        idf = idf_cache[w] = _idf(index, w)
+                    best = max(best, idf * wtf / (K1 + wtf))
+                s += best
+                continue
+            for w, idf in variants:
+                wtf = 0.0
+                for f, weight in FIELD_WEIGHTS.items():
+                    c = tf[f].get(w)
+                    if c:
+                        wtf += weight * c / norm[f]
+                if wtf:
+                    best = max(best, idf * wtf / (K1 + wtf))
+            s += best
+        if s and popularity:
+            s *= boost(popularity.get(pid, 0.0))
+        scores[pid] = s
+    return scores
+
+
+def bm25_explain(index: CatalogIndex, q: str, pid: str, popularity: dict[str, float] | None = None) -> dict:
+    """
+    Desglose del puntaje BM25F de un producto (modo explain del home):
+    por término de `q`, la expansión que ganó, su idf, las frecuencias por
+    campo y el aporte al total; más la popularidad y el puntaje final.
+    Mismas cuentas que bm25_scores.
+    """
+    tf = index.doc_tf.get(pid) or {}
+    lens = index.doc_len.get(pid) or {}
+    avg = {f: index.avg_field_len(f) for f in FIELD_WEIGHTS}
+    norm = {
+        f: (1.0 - B + B * lens.get(f, 0) / avg[f]) if avg[f] else 1.0
+        for f in FIELD_WEIGHTS
+    }
+
+    terms: list[dict] = []
+    total = 0.0
+    for t in dict.fromkeys(tokenize(q)):
+        best = {"termino": t, "token": None, "idf": 0.0, "campos": {}, "puntaje": 0.0}
+        best_s = 0.0
+        # solo los tokens del producto que empiezan por `t` (ver _prefix_wtf)
+        for w, wtf in _prefix_wtf(tf, norm, t).items():
+            fields = {f: tf[f][w] for f in FIELD_WEIGHTS if tf.get(f, {}).get(w)}
+            idf = _idf(index, w)
+            s = idf * wtf / (K1 + wtf)
+            if s > best_s:
+                best_s = s
+                best = {"termino": t, "token": w, "idf": round(idf, 4), "campos": fields, "puntaje": round(s, 4)}
+        total += best_s
+        terms.append(best)
+    pop = (popularity or {}).get(pid, 0.0)
+    final = total * boost(pop) if total and popularity else total
+    return {
+        "total": round(total, 4),
+        "terminos": terms,
+        "popularidad": round(pop, 3),
+        "final": round(final, 4),
+    }
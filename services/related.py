@@ -0,0 +1,160 @@
+# services/related.py
+from __future__ import annotations
+
+from collections import Counter
+import heapq
+import math
+import threading
+
+from db.repo_json import catalog_version
+from services.search_index import locked_index
+
+
+RELATED_N = 6              # vecinos guardados por producto
+CONTENT_FIELDS = {"name": 2.0, "tags": 2.0, "description": 1.0}
+CATEGORY_BONUS = 0.15      # misma categoría suma un poco
+COVIEW_WEIGHT = 0.5        # peso de "vistos en la misma sesión" frente al contenido
+MAX_DF_RATIO = 0.3         # tokens en más del 30% del catálogo no generan candidatos
+EVENTS_BUCKET = 200        # re-calcular co-vistas cada tantos eventos nuevos
+SYNC_BUILD_MAX_DOCS = 2000  # catálogos chicos: la primera vez se calcula en línea
+MIN_SCORE = 0.08           # por debajo, mejor no mostrar nada que mostrar ruido
+
+
+def _vectors(doc_tf: dict, pids: list[str]) -> tuple[dict[str, dict[str, float]], dict[str, set[str]]]:
+    """TF-IDF (campos ponderados) normalizado por documento + postings locales token -> pids."""
+    weighted: dict[str, Counter] = {}
+    df: Counter = Counter()
+    for pid in pids:
+        tf = doc_tf.get(pid) or {}
+        w: Counter = Counter()
+        for f, fw in CONTENT_FIELDS.items():
+            for t, c in (tf.get(f) or {}).items():
+                w[t] += fw * c
+        weighted[pid] = w
+        df.update(w.keys())
+
+    n = len(pids)
+    postings: dict[str, set[str]] = {}
+    vecs: dict[str, dict[str, float]] = {}
+    for pid, w in weighted.items():
+        vec = {t: (1.0 + math.log(x)) * math.log(1.0 + n / df[t]) for t, x in w.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        vecs[pid] = {t: v / norm for t, v in vec.items()}
+        for t in w:
+            if df[t] <= max(2, MAX_DF_RATIO * n):
+                postings.setdefault(t, set()).add(pid)
+    return vecs, postings
+
+
+def coview_counts(events: list[dict]) -> dict[str, Counter]:
+    """Pares de productos vistos por el mismo usuario/visitante (view_product)."""
+    by_viewer: dict[str, list[str]] = {}
+    for e in events:
+        if e.get("type") != "view_product" or not e.get("product_id"):
+            continue
+        viewer = e.get("user_id") or e.get("anon_id")
+        if viewer:
+            by_viewer.setdefault(viewer, []).append(e["product_id"])
+
+    out: dict[str, Counter] = {}
+    for seen in by_viewer.values():
+        uniq = list(dict.fromkeys(seen))[-50:]
+        for a in uniq:
+            for b in uniq:
+                if a != b:
+                    out.setdefault(a, Counter())[b] += 1
+    return out
+
+
+def compute_related(
+    doc_tf: dict,
+    categories: dict[str, str],
+    visible: list[str],
+    coviews: dict[str, Counter],
+    n: int = RELATED_N,
+) -> dict[str, list[str]]:
+    """
+    Vecinos de cada producto visible: coseno TF-IDF (nombre, tags, descripción)
+    + bono por categoría + co-vistas normalizadas. Candidatos = los que
+    comparten algún token no trivial (postings) o fueron co-vistos.
+    """
+    vecs, postings = _vectors(doc_tf, visible)
+    visible_set = set(visible)
+
+    out: dict[str, list[str]] = {}
+    for pid in visible:
+        vec = vecs.get(pid) or {}
+        scores: Counter = Counter()
+        for t, v in vec.items():
+            for other in postings.get(t, ()):
+                if other != pid:
+                    scores[other] += v * vecs[other][t]
+
+        cat = categories.get(pid)
+        if cat:
+            for other in scores:
+                if categories.get(other) == cat:
+                    scores[other] += CATEGORY_BONUS
+
+        co = coviews.get(pid)
+        if co:
+            top = max(co.values())
+            for other, c in co.items():
+                if other in visible_set and other != pid:
+                    scores[other] += COVIEW_WEIGHT * c / top
+
+        best = heapq.nlargest(n, scores.items(), key=lambda x: (x[1], x[0]))
+        out[pid] = [other for other, sc in best if sc >= MIN_SCORE]
+    return out
+
+
+# Listas precalculadas, compartidas entre sesiones (se re-arman en segundo plano)
+_STATE: dict[str, object] = {"key": None, "lists": {}, "building": False}
+_LOCK = threading.Lock()
+
+
+def _build(db: dict, key: tuple, events: list[dict]) -> None:
+    try:
+        # lo que se lee del índice se copia bajo su lock; el cálculo corre sin bloquear búsquedas
+        with locked_index(db) as index:
+            doc_tf = dict(index.doc_tf)
+            categories = {pid: norm.get("category", "") for pid, norm in index.doc_norm.items()}
+            visible = index.mask_to_ids(index.facets.visible())
+
+        lists = compute_related(doc_tf, categories, visible, coview_counts(events))
+        with _LOCK:
+            _STATE["lists"] = lists
+            _STATE["key"] = key
+    finally:
+        with _LOCK:
+            _STATE["building"] = False
+
+
+def _refresh_key(db: dict) -> tuple:
+    # events_total (analytics.track_event) sigue creciendo aunque db["events"] esté topado
+    total = (db.get("meta") or {}).get("events_total", len(db.get("events", []) or []))
+    return (catalog_version(db), int(total or 0) // EVENTS_BUCKET)
+
+
+def refresh_related(db: dict) -> None:
+    """Lanza el re-cálculo si cambió el catálogo o hay co-vistas nuevas (no bloquea)."""
+    key = _refresh_key(db)
+    with _LOCK:
+        if _STATE["key"] == key or _STATE["building"]:
+            return
+        _STATE["building"] = True
+        first = not _STATE["lists"]
+
+    events = list(db.get("events", []) or [])
+    if first and len(db.get("products", []) or []) <= SYNC_BUILD_MAX_DOCS:
+        _build(db, key, events)
+        return
+    threading.Thread(target=_build, args=(db, key, events), name="related-products", daemon=True).start()
+
+
+def related_ids(db: dict, product_id: str, n: int = RELATED_N) -> list[str]:
+    """Vecinos precalculados de `product_id` (lookup O(1); puede venir de la versión anterior)."""
+    refresh_related(db)
+    with _LOCK:
+        lists = _STATE["lists"]
+    return list(lists.get(product_id, []))[:n]
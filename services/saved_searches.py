@@ -0,0 +1,317 @@
+# services/saved_searches.py
+from __future__ import annotations
+
+import threading
+
+from db.repo_json import new_id, now_iso
+from services import change_events
+from services.query_parser import parse_query, resolve_filters
+from services.search_index import is_exact_term, locked_index, tokenize
+from services.text import normalize_query
+
+
+# Búsquedas guardadas + "percolador": en vez de re-ejecutar cada búsqueda
+# guardada cuando se publica algo, se indexan las búsquedas por UNA condición
+# obligatoria (ancla) y el producto publicado busca solo en las anclas que
+# él mismo cumple. Las coincidencias van a una bandeja de salida (outbox).
+#
+# db["saved_searches"]       = [{id, user_id, label, q, created_at, rule}]
+# db["saved_search_seen"]    = {search_id: [product_id, ...]}  (no avisar dos veces)
+# db["notification_outbox"]  = [{id, ts, type, user_id, search_id, product_id, status, read_at?}]
+#                              status: PENDING -> READ (mark_read, al abrir las coincidencias)
+MAX_PER_USER = 20
+SEEN_MAX = 200
+MAX_OUTBOX = 5000
+
+
+def _searches(db: dict) -> list[dict]:
+    return db.setdefault("saved_searches", [])
+
+
+def _bump_version(db: dict) -> None:
+    meta = db.setdefault("meta", {})
+    meta["saved_searches_version"] = int(meta.get("saved_searches_version", 0) or 0) + 1
+
+
+def compile_rule(facets, q: str, category: str, city: str, tag: str, price_range: tuple[int, int] | None) -> dict | None:
+    """
+    Condiciones de la búsqueda, resueltas igual que en el home (campos de `q`
+    + barra lateral): términos analizados, facetas y rango de precio.
+    None si no pide nada o se contradice.
+    """
+    parsed = parse_query(q)
+    f = resolve_filters(facets, parsed, category, city, tag, price_range)
+    if f["conflict"]:
+        return None
+    # facetas normalizadas: "ciudad:medellin" debe servir aunque hoy no haya nada en "Medellín"
+    rule = {
+        "terms": list(dict.fromkeys(tokenize(parsed.text))),
+        "category": normalize_query(f["category"] or ""),
+        "city": normalize_query(f["city"] or ""),
+        "tag": f["tag"] or "",
+        "price": list(f["price_range"]) if f["price_range"] is not None else None,
+    }
+    if not (rule["terms"] or rule["category"] or rule["city"] or rule["tag"] or rule["price"]):
+        return None
+    return rule
+
+
+def save_search(
+    db: dict,
+    user_id: str,
+    q: str,
+    category: str,
+    city: str,
+    tag: str,
+    price_range: tuple[int, int] | None = None,
+    label: str = "",
+) -> dict | None:
+    """Guarda la búsqueda actual del usuario (si ya la tenía, retorna esa). None si no hay qué guardar."""
+    with locked_index(db) as index:
+        rule = compile_rule(index.facets, q, category, city, tag, price_range)
+    if rule is None:
+        return None
+
+    mine = [s for s in _searches(db) if s.get("user_id") == user_id]
+    for s in mine:
+        if s.get("rule") == rule:
+            return s
+    if len(mine) >= MAX_PER_USER:
+        delete_search(db, user_id, mine[0]["id"])
+
+    s = {
+        "id": new_id(),
+        "user_id": user_id,
+        "label": label or (q or "").strip() or "Búsqueda con filtros",
+        "q": q or "",
+        "created_at": now_iso(),
+        "rule": rule,
+    }
+    _searches(db).append(s)
+    # lo que ya la cumple hoy no es "nuevo": solo avisan publicaciones posteriores
+    with locked_index(db) as index:
+        db.setdefault("saved_search_seen", {})[s["id"]] = _current_matches(db, index, s)[-SEEN_MAX:]
+    _bump_version(db)
+    return s
+
+
+def delete_search(db: dict, user_id: str, search_id: str) -> None:
+    db["saved_searches"] = [
+        s for s in _searches(db) if not (s.get("id") == search_id and s.get("user_id") == user_id)
+    ]
+    (db.get("saved_search_seen") or {}).pop(search_id, None)
+    db["notification_outbox"] = [
+        n for n in (db.get("notification_outbox") or [])
+        if not (n.get("search_id") == search_id and n.get("user_id") == user_id)
+    ]
+    _bump_version(db)
+
+
+def user_searches(db: dict, user_id: str) -> list[dict]:
+    return [s for s in (db.get("saved_searches") or []) if s.get("user_id") == user_id]
+
+
+def pending_notifications(db: dict, user_id: str) -> list[dict]:
+    return [
+        n for n in (db.get("notification_outbox") or [])
+        if n.get("user_id") == user_id and n.get("status") == "PENDING"
+    ]
+
+
+def search_matches(db: dict, user_id: str, search_id: str, limit: int = 12) -> list[str]:
+    """
+    Productos avisados para una búsqueda guardada (pendientes y leídos, el
+    más reciente primero), solo los que siguen visibles.
+    """
+    ids = [
+        n.get("product_id") for n in reversed(db.get("notification_outbox") or [])
+        if n.get("user_id") == user_id and n.get("search_id") == search_id
+    ]
+    out: list[str] = []
+    with locked_index(db) as index:
+        visible = index.facets.visible()
+        for pid in dict.fromkeys(ids):
+            o = index.doc_ord.get(pid)
+            if o is not None and (visible >> o) & 1:
+                out.append(pid)
+                if len(out) >= limit:
+                    break
+    return out
+
+
+def mark_read(db: dict, user_id: str, search_id: str) -> int:
+    """Marca como leídos los avisos pendientes de `search_id` (el usuario abrió sus coincidencias). Retorna cuántos."""
+    n_read = 0
+    ts = now_iso()
+    for n in db.get("notification_outbox") or []:
+        if n.get("user_id") == user_id and n.get("search_id") == search_id and n.get("status") == "PENDING":
+            n["status"] = "READ"
+            n["read_at"] = ts
+            n_read += 1
+    return n_read
+
+
+def _trim_outbox(db: dict) -> None:
+    """Tope global MAX_OUTBOX: se van primero los leídos, luego los más viejos."""
+    outbox = db.get("notification_outbox") or []
+    if len(outbox) <= MAX_OUTBOX:
+        return
+    extra = len(outbox) - MAX_OUTBOX
+    drop = {i for i, n in enumerate(outbox) if n.get("status") == "READ"}
+    drop = set(sorted(drop)[:extra])
+    i = 0
+    while len(drop) < extra:
+        drop.add(i)
+        i += 1
+    db["notification_outbox"] = [n for i, n in enumerate(outbox) if i not in drop]
+
+
+# ---------------------------
+# Percolador
+# ---------------------------
+class Percolator:
+    """
+    Búsquedas guardadas indexadas por su condición más selectiva:
+    - con texto: el término más largo ("t:brownie")
+    - sin texto: tag > categoría > ciudad ("g:regalo", "c:comida", "y:bogota")
+    - solo precio: "*"
+    Un producto consulta las anclas que cumple (prefijos de sus tokens y sus
+    facetas) y solo verifica esas candidatas: el costo depende del producto
+    y de las búsquedas que coinciden, no del total guardado.
+    """
+
+    def __init__(self, searches: list[dict]) -> None:
+        self.buckets: dict[str, list[dict]] = {}
+        for s in searches:
+            rule = s.get("rule") or {}
+            entry = {"id": s.get("id"), "user_id": s.get("user_id"), "rule": rule}
+            self.buckets.setdefault(self.anchor(rule), []).append(entry)
+
+    @staticmethod
+    def anchor(rule: dict) -> str:
+        if rule.get("terms"):
+            return "t:" + max(rule["terms"], key=len)
+        for dim, prefix in (("tag", "g:"), ("category", "c:"), ("city", "y:")):
+            if rule.get(dim):
+                return prefix + rule[dim]
+        return "*"
+
+    def match(self, index, p: dict, prof: dict) -> list[dict]:
+        """Búsquedas guardadas que cumple el producto `p` (ya indexado y visible). Llamar con el índice bloqueado."""
+        pid = p.get("id")
+        o = index.doc_ord.get(pid)
+        if o is None or not (index.facets.visible() >> o) & 1:
+            return []
+        tokens = index.doc_tokens.get(pid) or set()
+        have = {
+            "category": {normalize_query(p.get("category") or "")},
+            "city": {normalize_query(prof.get("city") or "")},
+            "tag": set((index.doc_norm.get(pid) or {}).get("tags") or []),
+        }
+
+        keys = {"*"}
+        for dim, prefix in (("tag", "g:"), ("category", "c:"), ("city", "y:")):
+            keys.update(prefix + v for v in have[dim])
+        for w in tokens:
+            keys.update("t:" + w[:i] for i in range(1, len(w) + 1))
+
+        price = index.price_of(o)
+        out: list[dict] = []
+        for key in keys:
+            for entry in self.buckets.get(key, ()):
+                rule = entry["rule"]
+                if any(rule.get(dim) and rule[dim] not in have[dim] for dim in have):
+                    continue
+                if rule.get("price") and price is not None and not (rule["price"][0] <= price <= rule["price"][1]):
+                    continue
+                if not all(
+                    (t in tokens) if is_exact_term(t) else any(w.startswith(t) for w in tokens)
+                    for t in rule.get("terms") or []
+                ):
+                    continue
+                out.append(entry)
+        return out
+
+
+def _current_matches(db: dict, index, search: dict) -> list[str]:
+    """Productos visibles que ya cumplen `search` (mismo criterio que el percolador). Con el índice bloqueado."""
+    perc = Percolator([search])
+    terms = (search.get("rule") or {}).get("terms") or []
+    if terms:
+        candidates = index._term_ids(max(terms, key=len))
+    else:
+        candidates = index.mask_to_ids(index.facets.visible())
+    profiles_by_id = {x.get("id"): x for x in (db.get("profiles", []) or [])}
+    out: list[str] = []
+    for pid in candidates:
+        p = index.product_at(db, pid)
+        if p and perc.match(index, p, profiles_by_id.get(p.get("profile_id")) or {}):
+            out.append(pid)
+    return out
+
+
+_CACHE: dict[str, object] = {"version": None, "perc": None}
+_LOCK = threading.Lock()
+
+
+def get_percolator(db: dict) -> Percolator:
+    """Se re-arma solo cuando alguien guarda o borra una búsqueda."""
+    version = int((db.get("meta") or {}).get("saved_searches_version", 0) or 0)
+    with _LOCK:
+        if _CACHE["version"] != version or _CACHE["perc"] is None:
+            _CACHE["perc"] = Percolator(db.get("saved_searches") or [])
+            _CACHE["version"] = version
+        return _CACHE["perc"]
+
+
+def percolate(db: dict, product_ids) -> int:
+    """Encola un aviso por cada (búsqueda guardada, producto visible) nuevo. Retorna cuántos."""
+    if not db.get("saved_searches") or not product_ids:
+        return 0
+    perc = get_percolator(db)
+    profiles_by_id = {p.get("id"): p for p in (db.get("profiles", []) or [])}
+    users_by_id = {u.get("id"): u for u in (db.get("users", []) or [])}
+    seen = db.setdefault("saved_search_seen", {})
+    outbox = db.setdefault("notification_outbox", [])
+
+    queued = 0
+    with locked_index(db) as index:
+        for pid in dict.fromkeys(product_ids or []):
+            p = index.product_at(db, pid)
+            if not p:
+                continue
+            # dueño bloqueado: product_detail no lo muestra, no se avisa
+            owner = users_by_id.get(p.get("owner_user_id"))
+            if owner and (owner.get("status") or "").upper() != "ACTIVE":
+                continue
+            for entry in perc.match(index, p, profiles_by_id.get(p.get("profile_id")) or {}):
+                if entry["user_id"] == p.get("owner_user_id"):
+                    continue
+                already = seen.setdefault(entry["id"], [])
+                if pid in already:
+                    continue
+                already.append(pid)
+                del already[:-SEEN_MAX]
+                outbox.append({
+                    "id": new_id(),
+                    "ts": now_iso(),
+                    "type": "saved_search_match",
+                    "user_id": entry["user_id"],
+                    "search_id": entry["id"],
+                    "product_id": pid,
+                    "status": "PENDING",
+                })
+                queued += 1
+
+    _trim_outbox(db)
+    return queued
+
+
+def _on_catalog_change(db: dict, event: dict) -> None:
+    # solo lo que RECIÉN se hizo visible (publicar, aprobar perfil, reactivar dueño);
+    # editar un logo o quitar una sugerencia de tag no es un producto nuevo
+    percolate(db, event.get("became_public") or [])
+
+
+for _event_type in change_events.EVENT_TYPES:
+    change_events.subscribe(_event_type, _on_catalog_change)
@@ -0,0 +1,820 @@
+# services/search_index.py
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from contextlib import contextmanager
+import os
+import pickle
+import re
+import threading
+import time
+
+from db.repo_json import DATA_DIR, catalog_version
+from services import change_events, columnar
+from services.facets import FacetIndex, mask_to_ords, ords_to_mask
+from services.synonyms import compile_synonyms, get_synonym_groups
+from services.text import analyze_normalized, edit_distance, normalize_query, trigrams
+
+
+# Búsqueda tolerante a errores (trigramas sobre el vocabulario)
+FUZZY_MIN_RESULTS = 3   # solo se activa si la búsqueda exacta trae menos que esto
+FUZZY_MIN_LEN = 4       # términos más cortos no se corrigen
+
+
+# Campos con estadísticas por documento (para BM25 en services/ranking.py)
+RANKED_FIELDS = ("name", "tags", "description", "business_name")
+
+
+# Emails en la consulta: un solo término exacto (sin partir en "@"/"." ni expandir por prefijo)
+_EMAIL_RE = re.compile(r"[^\s@]+@[^\s@]+")
+
+
+def is_exact_term(term: str) -> bool:
+    """Términos que no se expanden por prefijo ni se corrigen (emails)."""
+    return "@" in term
+
+
+def tokenize(s: str) -> list[str]:
+    """
+    Analizador español (services/text.py): normaliza, quita palabras vacías y
+    aplica stemming liviano. El índice guarda los mismos tokens, así
+    "galletas" y "galleta" son el mismo término.
+    Los emails de la consulta quedan enteros ("user5@demo.com"): el índice
+    guarda el email del dueño como un token más y se comparan exacto.
+    """
+    qn = normalize_query(s)
+    emails = _EMAIL_RE.findall(qn)
+    if not emails:
+        return analyze_normalized(qn)
+    return [*emails, *analyze_normalized(_EMAIL_RE.sub(" ", qn))]
+
+
+def product_search_norm(p: dict) -> dict:
+    """
+    Formas normalizadas de los campos buscables del producto.
+    Se calculan al guardar (views/my_products.py) y viajan con el producto
+    en db.json como p["search_norm"].
+    """
+    return {
+        "name": normalize_query(p.get("name") or ""),
+        "description": normalize_query(p.get("description") or ""),
+        "category": normalize_query(p.get("category") or ""),
+        "tags": [normalize_query(t) for t in (p.get("tags") or [])],
+    }
+
+
+def profile_search_norm(prof: dict) -> dict:
+    """Igual que product_search_norm, para el perfil (views/my_profile.py)."""
+    return {
+        "business_name": normalize_query(prof.get("business_name") or ""),
+        "city": normalize_query(prof.get("city") or ""),
+    }
+
+
+def _stored_norm(row: dict, build) -> dict:
+    # Filas viejas (sin search_norm) se normalizan aquí, una vez por versión
+    return row.get("search_norm") or build(row)
+
+
+class CatalogIndex:
+    """
+    Índice invertido del catálogo: token normalizado -> ids de producto.
+
+    - Se construye una vez por versión de catálogo (db["meta"]["catalog_version"]).
+    - Cuando cambia la versión, solo se re-indexan los productos cuya
+      firma (producto / perfil / dueño) cambió.
+    - Las consultas de varias palabras (AND) son intersecciones de postings.
+    """
+
+    def __init__(self) -> None:
+        self.version: str | None = None
+        self.postings: dict[str, set[str]] = {}
+        self.doc_tokens: dict[str, set[str]] = {}
+        self.doc_norm: dict[str, dict] = {}
+        # BM25: frecuencias y longitudes por campo + totales para el promedio
+        self.doc_tf: dict[str, dict[str, dict[str, int]]] = {}
+        self.doc_len: dict[str, dict[str, int]] = {}
+        self.field_len_total: dict[str, int] = {f: 0 for f in RANKED_FIELDS}
+        self.doc_sig: dict[str, tuple] = {}
+        self.doc_pos: dict[str, int] = {}
+        self._vocab: list[str] | None = None
+        # trigrama -> tokens del vocabulario que lo contienen
+        self.grams: dict[str, set[str]] = {}
+        # ordinal estable por producto (posición de bit en las facetas)
+        self.doc_ord: dict[str, int] = {}
+        self.ord_pid: list[str | None] = []
+        self._free_ords: list[int] = []
+        self.facets = FacetIndex()
+        # precios: (precio, ordinal) ordenado + bitset de "a convenir" (sin precio)
+        self.prices: list[tuple[int, int]] = []
+        self.unpriced = 0
+        self._doc_price: dict[int, int | None] = {}
+        self._price_summary: tuple[str | None, dict] | None = None
+        # columnas NumPy (opcional) para filtrar/ordenar vectorizado en catálogos grandes
+        self.columns = columnar.ColumnStore() if columnar.available() else None
+        # sinónimos (admin) compilados: token -> tokens equivalentes, aplicados al indexar
+        self.synonyms: dict[str, frozenset[str]] = {}
+
+    # ---------------------------
+    # Mantenimiento
+    # ---------------------------
+    @staticmethod
+    def _signature(p: dict, prof: dict, owner: dict) -> tuple:
+        return (
+            p.get("updated_at") or p.get("created_at") or "",
+            p.get("catalog_rev") or "",
+            (p.get("status") or "").upper(),
+            prof.get("id"),
+            prof.get("updated_at") or "",
+            prof.get("catalog_rev") or "",
+            bool(prof.get("is_approved", False)),
+            owner.get("email") or "",
+        )
+
+    @staticmethod
+    def _facet_values(p: dict, prof: dict, norm: dict) -> dict[str, list[str]]:
+        # mismas claves que compara filter_products (categoría/ciudad exactas, tag normalizado)
+        return {
+            "category": [p.get("category") or ""],
+            "city": [prof.get("city") or ""],
+            "tag": list(norm.get("tags") or []),
+            "status": [(p.get("status") or "").upper()],
+        }
+
+    def _ordinal(self, pid: str) -> int:
+        o = self.doc_ord.get(pid)
+        if o is None:
+            if self._free_ords:
+                o = self._free_ords.pop()
+                self.ord_pid[o] = pid
+            else:
+                o = len(self.ord_pid)
+                self.ord_pid.append(pid)
+            self.doc_ord[pid] = o
+        return o
+
+    def _release(self, pid: str) -> None:
+        o = self.doc_ord.pop(pid, None)
+        if o is not None:
+            self.ord_pid[o] = None
+            self._free_ords.append(o)
+
+    @staticmethod
+    def _doc_norm(p: dict, prof: dict, owner: dict) -> dict:
+        pn = _stored_norm(p, product_search_norm)
+        fn = _stored_norm(prof, profile_search_norm) if prof else {}
+        return {
+            **pn,
+            "business_name": fn.get("business_name", ""),
+            "city": fn.get("city", ""),
+            "email": normalize_query(owner.get("email") or ""),
+        }
+
+    @staticmethod
+    def _doc_text(norm: dict) -> str:
+        return " ".join([
+            norm["name"],
+            norm["description"],
+            norm["category"],
+            " ".join(norm["tags"]),
+            norm["business_name"],
+            norm["city"],
+            norm["email"],
+        ])
+
+    @staticmethod
+    def _field_tokens(norm: dict, field: str) -> list[str]:
+        v = norm.get(field) or ""
+        if isinstance(v, list):
+            v = " ".join(v)
+        return analyze_normalized(v)
+
+    def _remove(self, pid: str) -> None:
+        o = self.doc_ord.get(pid)
+        if o is not None:
+            self.facets.remove(o)
+            self._remove_price(o)
+            if self.columns is not None:
+                self.columns.clear_row(o)
+
+        for f, n in (self.doc_len.pop(pid, None) or {}).items():
+            self.field_len_total[f] -= n
+        self.doc_tf.pop(pid, None)
+
+        for t in self.doc_tokens.pop(pid, set()):
+            ids = self.postings.get(t)
+            if ids is None:
+                continue
+            ids.discard(pid)
+            if not ids:
+                del self.postings[t]
+                self._vocab = None
+                for g in trigrams(t):
+                    toks = self.grams.get(g)
+                    if toks is not None:
+                        toks.discard(t)
+                        if not toks:
+                            del self.grams[g]
+        self.doc_norm.pop(pid, None)
+        self.doc_sig.pop(pid, None)
+        self.doc_pos.pop(pid, None)
+
+    def _expand(self, tokens: set[str]) -> set[str]:
+        """Tokens del documento + sus sinónimos (la consulta no se expande)."""
+        syn = self.synonyms
+        out = set(tokens)
+        for t in tokens:
+            out.update(syn.get(t, ()))
+        return out
+
+    def _add(self, pid: str, tokens: set[str]) -> None:
+        self.doc_tokens[pid] = tokens
+        for t in tokens:
+            ids = self.postings.get(t)
+            if ids is None:
+                self.postings[t] = {pid}
+                self._vocab = None
+                for g in trigrams(t):
+                    self.grams.setdefault(g, set()).add(t)
+            else:
+                ids.add(pid)
+
+    def _add_stats(self, pid: str, norm: dict) -> None:
+        tf: dict[str, Counter] = {}
+        lens: dict[str, int] = {}
+        for f in RANKED_FIELDS:
+            toks = self._field_tokens(norm, f)
+            tf[f] = Counter(toks)
+            for t, c in list(tf[f].items()):
+                for s in self.synonyms.get(t, ()):
+                    tf[f][s] = max(tf[f][s], c)
+            lens[f] = len(toks)
+            self.field_len_total[f] += len(toks)
+        # dicts planos: se leen con .get y se serializan mucho más rápido que Counter (snapshot)
+        self.doc_tf[pid] = {f: dict(c) for f, c in tf.items()}
+        self.doc_len[pid] = lens
+
+    def _add_price(self, o: int, pv) -> None:
+        if isinstance(pv, (int, float)):
+            price = int(pv)
+            insort(self.prices, (price, o))
+            self._doc_price[o] = price
+        else:
+            self.unpriced |= 1 << o
+            self._doc_price[o] = None
+
+    def _remove_price(self, o: int) -> None:
+        if o not in self._doc_price:
+            return
+        price = self._doc_price.pop(o)
+        if price is None:
+            self.unpriced &= ~(1 << o)
+            return
+        i = bisect_left(self.prices, (price, o))
+        if i < len(self.prices) and self.prices[i] == (price, o):
+            del self.prices[i]
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_tokens)
+
+    def avg_field_len(self, field: str) -> float:
+        n = self.n_docs
+        return (self.field_len_total.get(field, 0) / n) if n else 0.0
+
+    def sync(self, db: dict) -> int:
+        """
+        Alinea el índice con `db`. Retorna cuántos productos se re-indexaron.
+        Si la versión de catálogo no cambió, no hace nada.
+        """
+        version = catalog_version(db)
+        if self.version == version:
+            return 0
+
+        # si cambió el diccionario de sinónimos, se re-indexa todo
+        synonyms = compile_synonyms(get_synonym_groups(db))
+        if synonyms != self.synonyms:
+            self.synonyms = synonyms
+            self.doc_sig.clear()
+
+        products = db.get("products", []) or []
+        profiles_by_id = {p.get("id"): p for p in (db.get("profiles", []) or [])}
+        users_by_id = {u.get("id"): u for u in (db.get("users", []) or [])}
+
+        seen: set[str] = set()
+        changed = 0
+        for pos, p in enumerate(products):
+            pid = p.get("id")
+            if not pid:
+                continue
+            seen.add(pid)
+            self.doc_pos[pid] = pos
+
+            prof = profiles_by_id.get(p.get("profile_id")) or {}
+            owner = users_by_id.get(p.get("owner_user_id")) or {}
+            sig = self._signature(p, prof, owner)
+            if self.doc_sig.get(pid) == sig:
+                continue
+
+            self._index_doc(pid, pos, p, prof, owner, sig)
+            changed += 1
+
+        for pid in [x for x in self.doc_tokens if x not in seen]:
+            self._remove(pid)
+            self._release(pid)
+            changed += 1
+
+        self.version = version
+        return changed
+
+    def _index_doc(self, pid: str, pos: int, p: dict, prof: dict, owner: dict, sig: tuple) -> None:
+        self._remove(pid)
+        norm = self._doc_norm(p, prof, owner)
+        self.doc_norm[pid] = norm
+        tokens = self._expand(set(analyze_normalized(self._doc_text(norm))))
+        if norm["email"]:
+            tokens.add(norm["email"])  # email entero (búsqueda exacta por "@"), además de sus partes
+        self._add(pid, tokens)
+        self._add_stats(pid, norm)
+        o = self._ordinal(pid)
+        self.facets.add(o, self._facet_values(p, prof, norm), bool(prof.get("is_approved", False)))
+        self._add_price(o, p.get("price_value"))
+        if self.columns is not None:
+            fv = self._facet_values(p, prof, norm)
+            self.columns.set_row(
+                o,
+                category=fv["category"][0],
+                city=fv["city"][0],
+                tags=fv["tag"],
+                status=fv["status"][0],
+                approved=bool(prof.get("is_approved", False)),
+                price=p.get("price_value"),
+                updated_at=p.get("updated_at") or p.get("created_at") or "",
+            )
+        self.doc_sig[pid] = sig
+        self.doc_pos[pid] = pos
+
+    def apply_changes(self, db: dict, product_ids, prev_version: str) -> int:
+        """
+        Actualización incremental desde un evento de services/mutations.py:
+        re-indexa solo `product_ids` (O(docs cambiados)) y queda en la versión
+        actual. Si el índice no estaba en `prev_version` (se perdió algún
+        cambio), cae al sync completo por firmas.
+        """
+        if self.version != prev_version:
+            self.version = None  # fuerza la comparación de firmas (sync sale temprano si la versión coincide)
+            return self.sync(db)
+
+        products = db.get("products", []) or []
+        profiles_by_id = {p.get("id"): p for p in (db.get("profiles", []) or [])}
+        users_by_id = {u.get("id"): u for u in (db.get("users", []) or [])}
+
+        changed = 0
+        removed = False
+        for pid in dict.fromkeys(product_ids or []):
+            p = self.product_at(db, pid)
+            if p is None:
+                if pid in self.doc_tokens:
+                    self._remove(pid)
+                    self._release(pid)
+                    removed = True
+                    changed += 1
+                continue
+
+            pos = self.doc_pos.get(pid)
+            if pos is None or pos >= len(products) or products[pos] is not p:
+                pos = next(i for i, x in enumerate(products) if x is p)
+            prof = profiles_by_id.get(p.get("profile_id")) or {}
+            owner = users_by_id.get(p.get("owner_user_id")) or {}
+            # el evento ya dice que cambió: sin comparar firmas (updated_at es al segundo)
+            self._index_doc(pid, pos, p, prof, owner, self._signature(p, prof, owner))
+            changed += 1
+
+        if removed:
+            # borrar corre las posiciones de los que venían después
+            self.doc_pos = {p.get("id"): i for i, p in enumerate(products) if p.get("id")}
+
+        self.version = catalog_version(db)
+        return changed
+
+    # ---------------------------
+    # Consultas
+    # ---------------------------
+    def _vocabulary(self) -> list[str]:
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        return self._vocab
+
+    def expand_prefix(self, term: str) -> list[str]:
+        """Tokens del vocabulario que empiezan por `term` (rango en el vocabulario ordenado)."""
+        if is_exact_term(term):
+            return [term] if term in self.postings else []
+        vocab = self._vocabulary()
+        i = bisect_left(vocab, term)
+        out: list[str] = []
+        while i < len(vocab) and vocab[i].startswith(term):
+            out.append(vocab[i])
+            i += 1
+        return out
+
+    def _term_ids(self, term: str) -> set[str]:
+        """
+        Ids que contienen algún token que empieza por `term`
+        (así "brown" sigue encontrando "brownies", como antes).
+        Los emails solo coinciden enteros.
+        """
+        if is_exact_term(term):
+            return set(self.postings.get(term, ()))
+        vocab = self._vocabulary()
+        i = bisect_left(vocab, term)
+        if i >= len(vocab) or not vocab[i].startswith(term):
+            return set()
+        if i + 1 >= len(vocab) or not vocab[i + 1].startswith(term):
+            return set(self.postings[vocab[i]])
+
+        out: set[str] = set()
+        while i < len(vocab) and vocab[i].startswith(term):
+            out |= self.postings[vocab[i]]
+            i += 1
+        return out
+
+    def match(self, q: str) -> set[str] | None:
+        """
+        Ids de productos que contienen TODOS los términos de `q`.
+        None = sin términos (no filtra).
+        """
+        terms = list(dict.fromkeys(tokenize(q)))
+        if not terms:
+            return None
+
+        sets = [self._term_ids(t) for t in terms]
+        sets.sort(key=len)
+        out = set(sets[0])
+        for s in sets[1:]:
+            if not out:
+                break
+            out &= s
+        return out
+
+    def fuzzy_variants(self, term: str, limit: int = 5) -> list[str]:
+        """
+        Tokens del vocabulario a distancia de edición <= 1 (<= 2 si el término
+        es largo) de `term`. Los candidatos salen del índice de trigramas
+        (lema de q-gramas), sin recorrer todo el vocabulario.
+        """
+        if len(term) < FUZZY_MIN_LEN or is_exact_term(term):
+            return []
+        max_d = 1 if len(term) <= 6 else 2
+        grams = trigrams(term)
+        need = max(1, len(grams) - 3 * max_d)
+
+        shared: Counter = Counter()
+        for g in grams:
+            shared.update(self.grams.get(g, ()))
+
+        found: list[tuple[int, int, str]] = []
+        for tok, n in shared.items():
+            if n < need or tok == term:
+                continue
+            d = edit_distance(term, tok, max_d)
+            if d <= max_d:
+                found.append((d, -len(self.postings.get(tok) or ()), tok))
+        found.sort()
+        return [tok for _, _, tok in found[:limit]]
+
+    def match_fuzzy(self, q: str) -> tuple[set[str], list[str]]:
+        """
+        Como `match`, pero cada término acepta también sus variantes cercanas
+        ("brownis" -> "brownies", "moido" -> "molido").
+        Retorna (ids, variantes usadas) — las variantes sirven para el ranking.
+        """
+        terms = list(dict.fromkeys(tokenize(q)))
+        if not terms:
+            return set(), []
+
+        out: set[str] | None = None
+        used: list[str] = []
+        for t in terms:
+            ids = self._term_ids(t)
+            for v in self.fuzzy_variants(t):
+                ids = ids | self.postings.get(v, set())
+                used.append(v)
+            out = ids if out is None else (out & ids)
+            if not out:
+                return set(), used
+        return out or set(), used
+
+    def use_columnar(self) -> bool:
+        return self.columns is not None and self.n_docs >= columnar.COLUMNAR_MIN_DOCS
+
+    def ids_to_mask(self, ids) -> int:
+        return ords_to_mask(self.doc_ord[pid] for pid in ids if pid in self.doc_ord)
+
+    def mask_to_ids(self, mask: int) -> list[str]:
+        return [self.ord_pid[o] for o in mask_to_ords(mask) if self.ord_pid[o]]
+
+    # ---------------------------
+    # Precio
+    # ---------------------------
+    def price_mask(self, pr_min: int, pr_max: int) -> int | None:
+        """
+        Bitset de productos con precio en [pr_min, pr_max] (bisect) + los que
+        no tienen precio ("A convenir" siempre pasa). None = el rango cubre todo.
+        """
+        if not self.prices or (pr_min <= self.prices[0][0] and pr_max >= self.prices[-1][0]):
+            return None
+        lo = bisect_left(self.prices, (int(pr_min), -1))
+        hi = bisect_right(self.prices, (int(pr_max), float("inf")))
+        return ords_to_mask(o for _, o in self.prices[lo:hi]) | self.unpriced
+
+    def _price_seq(self, descending: bool, after: tuple[int, int] | None):
+        """
+        (precio, ordinal) en orden de listado, empezando justo después de `after`.
+        Descendente: mayor a menor; a igual precio, ordinal ascendente.
+        """
+        prices = self.prices
+        if not descending:
+            start = bisect_right(prices, after) if after else 0
+            for i in range(start, len(prices)):
+                yield prices[i]
+            return
+
+        if after:
+            p, o = after
+            # resto del mismo precio (ordinales mayores) y luego precios menores
+            yield from prices[bisect_right(prices, (p, o)):bisect_right(prices, (p, float("inf")))]
+            i = bisect_left(prices, (p, -1))
+        else:
+            i = len(prices)
+        while i:
+            j = bisect_left(prices, (prices[i - 1][0], -1), 0, i)
+            yield from prices[j:i]
+            i = j
+
+    def ords_by_price(
+        self,
+        mask: int,
+        descending: bool = False,
+        limit: int | None = None,
+        after: tuple[int | None, int] | None = None,
+    ) -> list[int]:
+        """
+        Ordinales de `mask` en orden de precio, leídos directo del índice
+        ordenado (sin ordenar resultados). Los "A convenir" van al final.
+        `after` = (precio, ordinal) del último ya entregado (precio None si
+        ya se iba en los "A convenir"), para paginar por cursor.
+        """
+        unpriced = mask_to_ords(mask & self.unpriced)
+        if after is not None and after[0] is None:
+            rest = [o for o in unpriced if o > after[1]]
+            return rest[:limit] if limit is not None else rest
+
+        wanted = set(mask_to_ords(mask & ~self.unpriced))
+        out: list[int] = []
+        for _, o in self._price_seq(descending, after):
+            if o in wanted:
+                out.append(o)
+                if limit is not None and len(out) >= limit:
+                    return out
+        out.extend(unpriced)
+        return out[:limit] if limit is not None else out
+
+    def price_of(self, o: int) -> int | None:
+        return self._doc_price.get(o)
+
+    def price_summary(self, bins: int = 10) -> dict:
+        """
+        Resumen de precios de lo visible (para el slider), calculado una vez
+        por versión: min, max, percentiles 5/95 e histograma de `bins` tramos.
+        """
+        if self._price_summary and self._price_summary[0] == self.version:
+            return self._price_summary[1]
+
+        visible = set(mask_to_ords(self.facets.visible()))
+        vals = [p for p, o in self.prices if o in visible]  # ya ordenados
+        summary: dict = {"min": None, "max": None, "p05": None, "p95": None, "histogram": []}
+        if vals:
+            lo, hi = vals[0], vals[-1]
+            width = max(1, (hi - lo + bins) // bins)
+            hist = [0] * bins
+            for v in vals:
+                hist[min(bins - 1, (v - lo) // width)] += 1
+            summary = {
+                "min": lo,
+                "max": hi,
+                "p05": vals[int(0.05 * (len(vals) - 1))],
+                "p95": vals[int(0.95 * (len(vals) - 1))],
+                "histogram": [(lo + i * width, n) for i, n in enumerate(hist)],
+            }
+        self._price_summary = (self.version, summary)
+        return summary
+
+    # ---------------------------
+    # Snapshot: solo el estado primario (vocabulario, tokens por documento,
+    # trigramas y columnas se re-arman al cargar)
+    # ---------------------------
+    def snapshot_state(self) -> dict:
+        """
+        Copia del estado primario para serializar FUERA del lock. Con el índice
+        bloqueado. Los valores por documento (tokens, frecuencias, normas) se
+        reemplazan enteros al re-indexar, así que basta copiar los dicts; los
+        postings se modifican en su lugar y se copian conjunto por conjunto.
+        """
+        return {
+            "version": self.version,
+            "postings": {t: set(ids) for t, ids in self.postings.items()},
+            "doc_norm": dict(self.doc_norm),
+            "doc_tf": dict(self.doc_tf),
+            "doc_len": dict(self.doc_len),
+            "field_len_total": dict(self.field_len_total),
+            "doc_sig": dict(self.doc_sig),
+            "doc_pos": dict(self.doc_pos),
+            "doc_ord": dict(self.doc_ord),
+            "ord_pid": list(self.ord_pid),
+            "free_ords": list(self._free_ords),
+            "facet_bits": {d: dict(v) for d, v in self.facets.bits.items()},
+            "facet_approved": self.facets.approved,
+            "facet_doc_keys": dict(self.facets._doc_keys),
+            "prices": list(self.prices),
+            "unpriced": self.unpriced,
+            "doc_price": dict(self._doc_price),
+            "synonyms": dict(self.synonyms),
+        }
+
+    @classmethod
+    def from_snapshot_state(cls, state: dict) -> "CatalogIndex":
+        """Índice desde snapshot_state(): re-arma trigramas y columnas (el vocabulario es perezoso)."""
+        index = cls()
+        index.version = state["version"]
+        index.postings = state["postings"]
+        index.doc_norm = state["doc_norm"]
+        index.doc_tf = state["doc_tf"]
+        index.doc_len = state["doc_len"]
+        index.field_len_total = state["field_len_total"]
+        index.doc_sig = state["doc_sig"]
+        index.doc_pos = state["doc_pos"]
+        index.doc_ord = state["doc_ord"]
+        index.ord_pid = state["ord_pid"]
+        index._free_ords = state["free_ords"]
+        index.facets.bits = state["facet_bits"]
+        index.facets.approved = state["facet_approved"]
+        index.facets._doc_keys = state["facet_doc_keys"]
+        index.prices = state["prices"]
+        index.unpriced = state["unpriced"]
+        index._doc_price = state["doc_price"]
+        index.synonyms = state["synonyms"]
+
+        # tokens por documento = postings invertidos; trigramas desde el vocabulario
+        for t, ids in index.postings.items():
+            for pid in ids:
+                index.doc_tokens.setdefault(pid, set()).add(t)
+            for g in trigrams(t):
+                index.grams.setdefault(g, set()).add(t)
+
+        if index.columns is not None:
+            for pid, o in index.doc_ord.items():
+                values: dict[str, list[str]] = {}
+                for dim, v in index.facets._doc_keys.get(o, []):
+                    values.setdefault(dim, []).append(v)
+                sig = index.doc_sig.get(pid) or ("",)
+                index.columns.set_row(
+                    o,
+                    category=(values.get("category") or [""])[0],
+                    city=(values.get("city") or [""])[0],
+                    tags=values.get("tag") or [],
+                    status=(values.get("status") or [""])[0],
+                    approved=bool((index.facets.approved >> o) & 1),
+                    price=index._doc_price.get(o),
+                    updated_at=sig[0],
+                )
+        return index
+
+    def product_at(self, db: dict, pid: str) -> dict | None:
+        """Acceso O(1) al producto en el snapshot actual (misma versión)."""
+        products = db.get("products", []) or []
+        pos = self.doc_pos.get(pid)
+        if pos is not None and pos < len(products) and products[pos].get("id") == pid:
+            return products[pos]
+        return next((p for p in products if p.get("id") == pid), None)
+
+
+# ---------------------------
+# Snapshot en disco (arranque en caliente)
+# ---------------------------
+# None = sin snapshot (benchmarks / catálogos sintéticos)
+SNAPSHOT_PATH: str | None = os.path.join(DATA_DIR, "search_index.pkl")
+SNAPSHOT_FORMAT = 5       # subir si cambia snapshot_state() o el analizador
+SNAPSHOT_EVERY_S = 300    # como mucho un snapshot cada 5 min; lo que falte se re-indexa al arrancar
+
+
+def load_snapshot(path: str | None = None) -> CatalogIndex | None:
+    """
+    Índice guardado por save_snapshot, o None si no hay / es de otro formato.
+    Queda con version=None: el primer sync compara firmas contra el db real
+    y re-indexa solo lo que cambió desde el snapshot (el delta).
+    """
+    path = path or SNAPSHOT_PATH
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+            if header.get("format") != SNAPSHOT_FORMAT:
+                return None
+            state = pickle.load(f)
+        index = CatalogIndex.from_snapshot_state(state)
+    except Exception:
+        return None
+    index.version = None
+    return index
+
+
+def save_snapshot(state: dict, path: str | None = None) -> bool:
+    """Serializa un snapshot_state() (escritura atómica: tmp + replace). No necesita el lock."""
+    path = path or SNAPSHOT_PATH
+    if not path:
+        return False
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "catalog_version": state.get("version"),
+        "n_docs": len(state.get("doc_ord") or {}),
+    }
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError:
+        return False
+    return True
+
+
+# Índice compartido por todas las sesiones del proceso
+_INDEX = CatalogIndex()
+_LOCK = threading.Lock()
+_SNAPSHOT: dict[str, object] = {"loaded": False, "saved_at": 0.0, "writing": False}
+
+
+def _sync_shared(db: dict) -> CatalogIndex:
+    """Carga el snapshot (una vez por proceso), sincroniza y guarda si toca. Con _LOCK tomado."""
+    global _INDEX
+    if not _SNAPSHOT["loaded"]:
+        _SNAPSHOT["loaded"] = True
+        snap = load_snapshot()
+        if snap is not None:
+            _INDEX = snap
+            # el delta de este arranque entra en el próximo snapshot periódico
+            _SNAPSHOT["saved_at"] = time.time()
+
+    _maybe_snapshot(_INDEX.sync(db))
+    return _INDEX
+
+
+def _write_snapshot(state: dict) -> None:
+    try:
+        save_snapshot(state)
+    finally:
+        _SNAPSHOT["writing"] = False
+
+
+def _maybe_snapshot(changed: int) -> None:
+    """
+    Con _LOCK tomado solo se copia el estado; el pickle y el archivo van en
+    un hilo aparte (las búsquedas no esperan la escritura).
+    """
+    now = time.time()
+    if changed and not _SNAPSHOT["writing"] and now - float(_SNAPSHOT["saved_at"]) >= SNAPSHOT_EVERY_S:
+        _SNAPSHOT["writing"] = True
+        _SNAPSHOT["saved_at"] = now
+        threading.Thread(
+            target=_write_snapshot, args=(_INDEX.snapshot_state(),), name="search-snapshot", daemon=True,
+        ).start()
+
+
+def _on_catalog_change(db: dict, event: dict) -> None:
+    """Suscriptor de services/change_events.py: índice al día sin re-escanear el catálogo."""
+    with _LOCK:
+        if not _SNAPSHOT["loaded"]:
+            _sync_shared(db)
+            return
+        changed = _INDEX.apply_changes(db, event.get("product_ids") or [], event.get("prev_version"))
+        _maybe_snapshot(changed)
+
+
+for _event_type in change_events.EVENT_TYPES:
+    change_events.subscribe(_event_type, _on_catalog_change)
+
+
+def get_index(db: dict) -> CatalogIndex:
+    """Retorna el índice compartido, sincronizado con la versión de `db`."""
+    with _LOCK:
+        return _sync_shared(db)
+
+
+@contextmanager
+def locked_index(db: dict):
+    """Índice sincronizado + lock tomado (para leer postings/estadísticas sin carreras)."""
+    with _LOCK:
+        yield _sync_shared(db)
@@ -0,0 +1,113 @@
+# services/sharded_search.py
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import itertools
+import os
+import threading
+
+from services.facets import mask_to_ords
+from services.ranking import bm25_scores
+
+
+# Workers del pool (SEARCH_WORKERS=1 o sin definir = sin shards, todo en el hilo actual).
+# APAGADO por defecto: el puntaje BM25 es Python puro y con el GIL de CPython
+# los hilos no corren en paralelo. scripts/bench_sharded_search.py con 60k
+# productos midió 0.46x–1.11x (2 y 4 workers contra 1): igual o más lento.
+# Solo vale la pena si el puntaje deja de ser Python puro (p. ej. sin GIL).
+SEARCH_WORKERS = max(1, int(os.environ.get("SEARCH_WORKERS", "1") or 1))
+
+# Por debajo de esto, repartir cuesta más que lo que ahorra
+SHARD_MIN_CANDIDATES = int(os.environ.get("SEARCH_SHARD_MIN", "20000") or 20000)
+
+# Pool compartido por el proceso (se re-crea solo si cambia la cantidad de workers)
+_POOL: dict[str, object] = {"workers": 0, "pool": None}
+_POOL_LOCK = threading.Lock()
+
+
+def _pool(workers: int) -> ThreadPoolExecutor:
+    with _POOL_LOCK:
+        if _POOL["pool"] is None or _POOL["workers"] != workers:
+            if _POOL["pool"] is not None:
+                _POOL["pool"].shutdown(wait=False)
+            _POOL["pool"] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search-shard")
+            _POOL["workers"] = workers
+        return _POOL["pool"]
+
+
+def should_shard(mask: int, workers: int | None = None) -> bool:
+    workers = SEARCH_WORKERS if workers is None else workers
+    return workers > 1 and mask.bit_count() >= SHARD_MIN_CANDIDATES
+
+
+def split_mask(mask: int, n_shards: int) -> list[int]:
+    """Parte el bitset en `n_shards` rangos contiguos de ordinales (sin recorrer bits)."""
+    width = mask.bit_length()
+    step = -(-width // n_shards) if width else 0
+    shards: list[int] = []
+    for start in range(0, width, step or 1):
+        part = mask & (((1 << step) - 1) << start)
+        if part:
+            shards.append(part)
+    return shards
+
+
+def _recency(p: dict) -> str:
+    return p.get("updated_at") or p.get("created_at") or ""
+
+
+def top_keys(
+    index,
+    db: dict,
+    rank_q: str,
+    mask: int,
+    k: int | None,
+    popularity: dict[str, float] | None = None,
+) -> list[tuple]:
+    """
+    Las `k` mejores claves de orden de `mask` (todas si k es None), de MEJOR a peor.
+    Clave = (BM25 × popularidad, recencia, -ordinal) o (recencia, -ordinal): el
+    -ordinal desempata por orden de alta. Con `k`, heap O(n log k) en vez de
+    ordenar todo. Es el único cálculo de orden: services/catalog.py lo usa
+    directo o por shards. Llamar con el índice bloqueado.
+    """
+    rows: list[tuple[int, dict]] = []
+    for o in mask_to_ords(mask):
+        pid = index.ord_pid[o]
+        p = index.product_at(db, pid) if pid else None
+        if p:
+            rows.append((o, p))
+
+    if rank_q:
+        scores = bm25_scores(index, rank_q, [p.get("id") for _, p in rows], popularity)
+        keys = [(scores.get(p.get("id"), 0.0), _recency(p), -o) for o, p in rows]
+    else:
+        keys = [(_recency(p), -o) for o, p in rows]
+
+    if k is None or k >= len(keys):
+        keys.sort(reverse=True)
+        return keys
+    return heapq.nlargest(k, keys)
+
+
+def sharded_keys(
+    index,
+    db: dict,
+    rank_q: str,
+    mask: int,
+    limit: int | None = None,
+    workers: int | None = None,
+    popularity: dict[str, float] | None = None,
+) -> list[tuple]:
+    """
+    Mismo resultado que top_keys, repartido: cada shard de ordinales calcula
+    su top-k en un hilo del pool y acá se mezclan los tops ya ordenados
+    (heapq.merge). Los idf/longitudes promedio son los globales del índice,
+    así los puntajes no dependen del shard. Llamar con el índice bloqueado.
+    """
+    workers = SEARCH_WORKERS if workers is None else workers
+    pool = _pool(workers)
+    parts = list(pool.map(lambda s: top_keys(index, db, rank_q, s, limit, popularity), split_mask(mask, workers)))
+    merged = heapq.merge(*parts, reverse=True)
+    return list(merged) if limit is None else list(itertools.islice(merged, limit))
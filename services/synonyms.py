@@ -0,0 +1,55 @@
+# services/synonyms.py
+from __future__ import annotations
+
+from services.text import analyze
+
+
+# Grupos iniciales (mientras el admin no guarde los suyos)
+DEFAULT_SYNONYMS: list[list[str]] = [
+    ["crispetas", "palomitas", "pop corn"],
+    ["domicilio", "a domicilio", "envíos", "delivery"],
+    ["ponqué", "torta", "pastel", "bizcocho"],
+]
+
+
+def get_synonym_groups(db: dict) -> list[list[str]]:
+    groups = db.get("search_synonyms")
+    if groups is None:
+        return [list(g) for g in DEFAULT_SYNONYMS]
+    return [list(g) for g in groups or []]
+
+
+def set_synonym_groups(db: dict, groups: list[list[str]]) -> None:
+    # sin vacíos ni repetidos dentro de cada grupo; grupos de 1 no sirven
+    clean: list[list[str]] = []
+    for g in groups or []:
+        uniq = list(dict.fromkeys(" ".join((w or "").split()) for w in g))
+        uniq = [w for w in uniq if w]
+        if len(uniq) > 1:
+            clean.append(uniq)
+    db["search_synonyms"] = clean
+
+
+def parse_synonym_lines(text: str) -> list[list[str]]:
+    """Un grupo por línea, términos separados por coma (formato del admin)."""
+    return [[w.strip() for w in line.split(",")] for line in (text or "").splitlines() if line.strip()]
+
+
+def format_synonym_lines(groups: list[list[str]]) -> str:
+    return "\n".join(", ".join(g) for g in groups)
+
+
+def compile_synonyms(groups: list[list[str]]) -> dict[str, frozenset[str]]:
+    """
+    Mapa de expansión término -> sinónimos, en tokens ya analizados
+    (mismo analizador que el índice). Solo entran los términos que quedan
+    en un token ("a domicilio" -> "domicili"); las frases largas se ignoran.
+    """
+    out: dict[str, set[str]] = {}
+    for g in groups:
+        terms = {toks[0] for toks in (analyze(w) for w in g) if len(toks) == 1}
+        if len(terms) < 2:
+            continue
+        for t in terms:
+            out.setdefault(t, set()).update(terms - {t})
+    return {t: frozenset(s) for t, s in out.items()}
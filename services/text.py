@@ -1,4 +1,5 @@
 from __future__ import annotations
+import re
 import unicodedata
 
 def normalize_query(s: str) -> str:
@@ -11,3 +12,69 @@ def normalize_query(s: str) -> str:
     s = unicodedata.normalize("NFKD", s)
     s = "".join(ch for ch in s if not unicodedata.combining(ch))
     return s
+
+
+# ---------------------------
+# Analizador español (índice y consulta)
+# ---------------------------
+_WORD_RE = re.compile(r"\w+")
+
+# Palabras vacías: no aportan al match ("tortas para eventos" = "tortas eventos").
+# "sin" y "con" NO van: "sin azúcar" / "sin gluten" es justo lo que se busca.
+STOPWORDS_ES = frozenset("""
+a al algo ante antes aqui asi contra cual cuando de del desde donde
+e el ella ellas ellos en entre era es esa esas ese eso esos esta estas este
+esto estos fue ha hay hasta la las le les lo los mas me mi mis muy ni no nos
+o otra otro para pero poco por porque que se sea ser si sobre son su sus
+tambien te ti tu tus u un una unas uno unos y ya yo
+""".split())
+
+
+def stem_es(token: str) -> str:
+    """
+    Stemming liviano (número y vocal final), igual en índice y consulta:
+    galletas/galleta -> gallet, postres/postre -> postr, panes/pan -> pan.
+    Tokens cortos o con dígitos quedan igual.
+    """
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith("es") and len(token) > 4:
+        token = token[:-2]
+    elif token.endswith("s"):
+        token = token[:-1]
+    if token[-1] in "aeo" and len(token) > 3:
+        token = token[:-1]
+    return token
+
+
+def analyze_normalized(s: str) -> list[str]:
+    """Tokens de un texto YA normalizado (p. ej. search_norm): sin vacías y con stem."""
+    return [stem_es(t) for t in _WORD_RE.findall(s or "") if t not in STOPWORDS_ES]
+
+
+def analyze(s: str) -> list[str]:
+    """normalize_query + analyze_normalized (para `q` y textos crudos)."""
+    return analyze_normalized(normalize_query(s))
+
+
+# ---------------------------
+# Distancia entre palabras (búsqueda tolerante / "¿quisiste decir?")
+# ---------------------------
+def trigrams(token: str) -> set[str]:
+    t = f"${token}$"
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+
+def edit_distance(a: str, b: str, max_d: int) -> int:
+    """Levenshtein con corte temprano: retorna max_d + 1 si se pasa."""
+    if abs(len(a) - len(b)) > max_d:
+        return max_d + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+        if min(cur) > max_d:
+            return max_d + 1
+        prev = cur
+    return prev[-1]
@@ -0,0 +1,95 @@
+# services/trending.py
+from __future__ import annotations
+
+import time
+
+from services.decay import bump, event_epoch, prune, top_n
+from services.search_index import locked_index
+from services.text import normalize_query
+
+
+# Tendencias = contadores con decaimiento corto (lo de hoy pesa más que lo de la semana pasada).
+# db["trending"] = {"products": {pid: [v, epoch]}, "profiles": {...}, "queries": {q_norm: [v, epoch]}}
+HALF_LIFE_S = 2 * 24 * 3600
+CONTACT_WEIGHT = 3.0
+MAX_KEYS = {"products": 20000, "profiles": 5000, "queries": 2000}
+MIN_QUERY_LEN = 2
+MIN_SCORE = 0.05   # por debajo ya no es tendencia (≈ una vista de hace 9 días)
+
+
+def _stores(db: dict) -> dict:
+    tr = db.setdefault("trending", {})
+    for kind in MAX_KEYS:
+        tr.setdefault(kind, {})
+    return tr
+
+
+def _bump(db: dict, kind: str, key: str, weight: float, now: float) -> None:
+    store = _stores(db)[kind]
+    bump(store, key, weight, now, HALF_LIFE_S)
+    if len(store) > MAX_KEYS[kind]:
+        prune(store, now, HALF_LIFE_S, MAX_KEYS[kind])
+
+
+def query_key(q: str) -> str:
+    """Búsquedas iguales salvo mayúsculas/tildes/espacios cuentan juntas."""
+    return " ".join(normalize_query(q).split())
+
+
+def record_event(
+    db: dict,
+    event_type: str,
+    *,
+    product_id: str | None = None,
+    profile_id: str | None = None,
+    meta: dict | None = None,
+    now: float | None = None,
+) -> None:
+    """Lo llama track_event: a lo sumo un contador por evento, O(1)."""
+    backfill(db)
+    now = time.time() if now is None else now
+    if event_type == "view_product" and product_id:
+        _bump(db, "products", product_id, 1.0, now)
+    elif (event_type or "").startswith("click_") and product_id:
+        _bump(db, "products", product_id, CONTACT_WEIGHT, now)
+    elif event_type == "view_profile" and profile_id:
+        _bump(db, "profiles", profile_id, 1.0, now)
+    elif event_type == "search":
+        q = query_key((meta or {}).get("q") or "")
+        if len(q) >= MIN_QUERY_LEN:
+            _bump(db, "queries", q, 1.0, now)
+
+
+def backfill(db: dict) -> None:
+    """Migración única desde el historial de eventos (bases anteriores a los contadores)."""
+    if "trending" in db:
+        return
+    _stores(db)
+    for e in db.get("events", []) or []:
+        when = event_epoch(e.get("ts"))
+        if when is None:
+            continue
+        record_event(
+            db,
+            e.get("type") or e.get("event") or "",
+            product_id=e.get("product_id"),
+            profile_id=e.get("profile_id"),
+            meta=e.get("meta"),
+            now=when,
+        )
+
+
+def top(db: dict, kind: str, n: int = 10) -> list[tuple[str, float]]:
+    """Los `n` con más puntaje decaído a hoy (heap de tamaño n, sin recorrer eventos)."""
+    backfill(db)
+    return [(k, v) for k, v in top_n(_stores(db)[kind], n, time.time(), HALF_LIFE_S) if v >= MIN_SCORE]
+
+
+def trending_product_ids(db: dict, n: int = 6) -> list[str]:
+    """Top productos en tendencia que hoy están visibles en el catálogo (publicados + perfil aprobado)."""
+    cands = [pid for pid, _ in top(db, "products", n * 3)]
+    if not cands:
+        return []
+    with locked_index(db) as index:
+        visible = set(index.mask_to_ids(index.ids_to_mask(cands) & index.facets.visible()))
+    return [pid for pid in cands if pid in visible][:n]
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.repo_json import bump_catalog_version, default_db  # noqa: E402
+from services import search_index  # noqa: E402
+
+# las pruebas arman catálogos en memoria: no leer ni pisar el snapshot de data/
+search_index.SNAPSHOT_PATH = None
+
+
+@pytest.fixture
+def make_db():
+    """
+    Catálogo mínimo en memoria: un emprendimiento aprobado (dueño activo) y
+    los productos dados (name, description, category, tags...), publicados.
+    Cada db sale con su propia versión de catálogo (los índices son por versión).
+    """
+
+    def _make(products: list[dict]) -> dict:
+        db = default_db()
+        db["users"].append({"id": "u1", "email": "emp@example.com", "role": "EMPRENDEDOR", "status": "ACTIVE"})
+        db["profiles"].append({
+            "id": "pf1",
+            "owner_user_id": "u1",
+            "business_name": "Dulces Ana",
+            "city": "Bogotá",
+            "is_approved": True,
+            "created_at": "2026-01-01T00:00:00Z",
+        })
+        for i, p in enumerate(products):
+            db["products"].append({
+                "id": f"p{i}",
+                "profile_id": "pf1",
+                "owner_user_id": "u1",
+                "category": "Comida",
+                "tags": [],
+                "description": "",
+                "status": "PUBLISHED",
+                "price_type": "FIXED",
+                "price_value": 10000 + i,
+                "created_at": f"2026-02-01T00:00:{i % 60:02d}Z",
+                **p,
+            })
+        # como mutations: el catalog_rev distingue "p0" de esta db del "p0" de la anterior
+        version = bump_catalog_version(db)
+        for x in db["products"] + db["profiles"]:
+            x["catalog_rev"] = version
+        return db
+
+    return _make
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from services import autocomplete, query_log
+
+
+def test_query_log_keeps_the_search_just_recorded(make_db):
+    db = make_db([])
+    for i in range(query_log.MAX_QUERIES):
+        query_log.record_search(db, f"busqueda {i}", 3)
+    query_log.record_search(db, "brownies veganos", 0)
+    assert "brownies veganos" in db["query_log"]["queries"]
+    assert len(db["query_log"]["queries"]) <= query_log.MAX_QUERIES
+
+
+def test_new_searches_do_not_rebuild_catalog_model(make_db):
+    db = make_db([{"name": "Galletas de avena"}, {"name": "Torta de chocolate"}])
+    ac = autocomplete.get_autocomplete(db)
+    for _ in range(query_log.REBUILD_EVERY * 2):
+        query_log.record_search(db, "galletas navideñas", 4)
+
+    assert autocomplete.get_autocomplete(db) is ac
+    # las búsquedas frecuentes igual aparecen, sumadas a las del catálogo
+    assert autocomplete.suggest(db, "galle")[0] == "galletas navideñas"
+    assert "Galletas de avena" in autocomplete.suggest(db, "galle")
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from services.catalog import cached_search_page, search_page
+
+ALL = ("Todas", "Todas", "Todos", (0, 10**9))
+
+
+def _catalog(make_db):
+    return make_db(
+        [{"name": f"Galletas de avena {i}", "tags": ["galletas"]} for i in range(12)]
+        + [{"name": f"Torta de chocolate {i}"} for i in range(12)]
+    )
+
+
+def test_explain_recomputes_stages_after_cached_pages(make_db):
+    db = _catalog(make_db)
+    for sort_by in ("Relevancia", "Más recientes"):
+        first = cached_search_page(db, f"galletas|{sort_by}", "galletas", *ALL, sort_by)
+        # "Cargar más" deja el orden completo en ORDER_CACHE
+        cached_search_page(db, f"galletas|{sort_by}", "galletas", *ALL, sort_by, cursor=first["next_cursor"])
+
+        ex: dict = {}
+        page = search_page(db, "galletas", *ALL, sort_by, page_size=18, explain=ex)
+        etapas = [e["etapa"] for e in ex["etapas"]]
+
+        assert page["total"] == 12
+        assert "texto (índice invertido)" in etapas
+        assert "corte de página" not in etapas
+        if sort_by == "Relevancia":
+            assert "puntaje BM25 + popularidad + top-k" in etapas
+            assert set(ex["puntajes"]) == set(page["ids"])
+
+
+def test_pages_follow_cursor_without_gaps(make_db):
+    db = _catalog(make_db)
+    full = search_page(db, "galletas", *ALL, "Relevancia", page_size=None)["ids"]
+    out, cursor = [], None
+    while True:
+        page = search_page(db, "galletas", *ALL, "Relevancia", page_size=5, cursor=cursor)
+        out += page["ids"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert out == full and len(full) == 12
+
+
+def test_sin_is_not_a_stopword(make_db):
+    db = make_db([{"name": "Torta sin azúcar"}, {"name": "Torta con azúcar"}, {"name": "Galletas sin gluten"}])
+    by_id = {p["id"]: p["name"] for p in db["products"]}
+
+    def names(q: str) -> set[str]:
+        return {by_id[i] for i in search_page(db, q, *ALL, "Relevancia", page_size=None)["ids"]}
+
+    assert names("azúcar") == {"Torta sin azúcar", "Torta con azúcar"}
+    assert names("sin azúcar") == {"Torta sin azúcar"}
+    assert names("con azúcar") == {"Torta con azúcar"}
+    assert names("sin gluten") == {"Galletas sin gluten"}
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from services import analytics, related
+
+
+def test_refresh_key_keeps_moving_after_events_cap(make_db):
+    db = make_db([{"name": "Galletas de avena"}])
+    db["events"] = [{"type": "view_home"}] * analytics.MAX_EVENTS
+    before = related._refresh_key(db)
+
+    for _ in range(related.EVENTS_BUCKET):
+        analytics.track_event(db, event_type="view_home", anon_id="a1")
+
+    assert len(db["events"]) == analytics.MAX_EVENTS
+    assert related._refresh_key(db) != before
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from db.repo_json import bump_catalog_version
+from services.saved_searches import mark_read, pending_notifications, percolate, save_search, search_matches
+
+
+def _publish(db: dict, pid: str, name: str) -> None:
+    db["products"].append({
+        "id": pid,
+        "profile_id": "pf1",
+        "owner_user_id": "u1",
+        "name": name,
+        "category": "Comida",
+        "tags": [],
+        "status": "PUBLISHED",
+        "created_at": "2026-03-01T00:00:00Z",
+    })
+    bump_catalog_version(db)
+    percolate(db, [pid])
+
+
+def test_opening_matches_marks_them_read(make_db):
+    db = make_db([{"name": "Galletas de avena"}])
+    db["users"].append({"id": "u2", "email": "cliente@example.com", "role": "CLIENTE", "status": "ACTIVE"})
+    saved = save_search(db, "u2", "galletas", "Todas", "Todas", "Todos")
+
+    # lo que ya existía al guardar no es "nuevo"
+    assert pending_notifications(db, "u2") == []
+
+    _publish(db, "new1", "Galletas de chocolate")
+    _publish(db, "new2", "Torta de vainilla")
+    assert [n["product_id"] for n in pending_notifications(db, "u2")] == ["new1"]
+    assert search_matches(db, "u2", saved["id"]) == ["new1"]
+
+    assert mark_read(db, "u2", saved["id"]) == 1
+    assert pending_notifications(db, "u2") == []
+    # leídos siguen listados en las coincidencias; otro usuario no los toca
+    assert search_matches(db, "u2", saved["id"]) == ["new1"]
+    assert mark_read(db, "u1", saved["id"]) == 0
@@ -8,8 +8,10 @@ import secrets
 
 from auth.guards import require_role
 from auth.hashing import hash_password
-from db.repo_json import user_profile, save_db, now_iso
+from db.repo_json import user_profile, save_db, now_iso, bump_catalog_version
 from services.featured import get_featured_products, set_featured_products
+from services.mutations import delete_product, set_product_status, set_profile_approval, set_user_status, update_product
+from services.synonyms import format_synonym_lines, get_synonym_groups, parse_synonym_lines, set_synonym_groups
 from services.catalog import format_price
 
 
@@ -75,8 +77,8 @@ def render(db):
     c3.metric("Productos publicados", published_products)
 
     st.write("")
-    t_users, t_products, t_featured, t_tags, t_backup = st.tabs(
-        ["👤 Usuarios", "📦 Productos", "⭐ Destacados", "🏷️ Tags", "🗄️ Backup"]
+    t_users, t_products, t_featured, t_tags, t_syn, t_backup = st.tabs(
+        ["👤 Usuarios", "📦 Productos", "⭐ Destacados", "🏷️ Tags", "🔁 Sinónimos", "🗄️ Backup"]
     )
 
     # =========================================================
@@ -193,34 +195,28 @@ def render(db):
                         with a:
                             if st.button("✅ Aprobar", use_container_width=True, key=f"admin_user_appr_{u_sel['id']}"):
                                 if prof_sel:
-                                    prof_sel["is_approved"] = True
-                                    prof_sel["updated_at"] = now_iso()
-                                u_sel["status"] = "ACTIVE"
-                                u_sel["updated_at"] = now_iso()
+                                    set_profile_approval(db, prof_sel, True)
+                                set_user_status(db, u_sel, "ACTIVE")
                                 save_db(db)
                                 st.rerun()
 
                         with b:
                             if st.button("🕒 Pendiente", use_container_width=True, key=f"admin_user_pend_{u_sel['id']}"):
                                 if prof_sel:
-                                    prof_sel["is_approved"] = False
-                                    prof_sel["updated_at"] = now_iso()
-                                u_sel["status"] = "PENDING"
-                                u_sel["updated_at"] = now_iso()
+                                    set_profile_approval(db, prof_sel, False)
+                                set_user_status(db, u_sel, "PENDING")
                                 save_db(db)
                                 st.rerun()
 
                         with c:
                             if st.button("⛔ Bloquear", use_container_width=True, key=f"admin_user_blk_{u_sel['id']}"):
-                                u_sel["status"] = "BLOCKED"
-                                u_sel["updated_at"] = now_iso()
+                                set_user_status(db, u_sel, "BLOCKED")
                                 save_db(db)
                                 st.rerun()
 
                         with d:
                             if st.button("🔓 Desbloquear", use_container_width=True, key=f"admin_user_unblk_{u_sel['id']}"):
-                                u_sel["status"] = "ACTIVE"
-                                u_sel["updated_at"] = now_iso()
+                                set_user_status(db, u_sel, "ACTIVE")
                                 save_db(db)
                                 st.rerun()
 
@@ -493,15 +489,13 @@ def render(db):
                                 next_status = "PUBLISHED"
 
                             if st.button(lbl, key=f"admin_prod_toggle_{selected_pid}", use_container_width=True):
-                                pr["status"] = next_status
-                                pr["updated_at"] = now_iso()
+                                set_product_status(db, pr, next_status)
                                 save_db(db)
                                 st.rerun()
 
                         with a3:
                             if st.button("🧊 Borrador", key=f"admin_prod_draft_{selected_pid}", use_container_width=True):
-                                pr["status"] = "DRAFT"
-                                pr["updated_at"] = now_iso()
+                                set_product_status(db, pr, "DRAFT")
                                 save_db(db)
                                 st.rerun()
 
@@ -518,7 +512,7 @@ def render(db):
                                 cA, cB = st.columns(2, gap="small")
                                 with cA:
                                     if st.button("✅ Sí, eliminar", key=f"admin_prod_del_yes_{selected_pid}", use_container_width=True):
-                                        db["products"] = [x for x in (db.get("products", []) or []) if x.get("id") != selected_pid]
+                                        delete_product(db, selected_pid)
                                         save_db(db)
                                         st.session_state[confirm_key] = False
                                         remaining = [x.get("id") for x in (db.get("products", []) or []) if x.get("id")]
@@ -649,11 +643,38 @@ def render(db):
                     if st.button("✅ Marcar revisada (limpiar)", key=f"admin_sug_clear_{selected_sug_pid}", use_container_width=True):
                         prod = next((x for x in (db.get("products", []) or []) if x.get("id") == selected_sug_pid), None)
                         if prod:
-                            prod["tag_suggestion"] = ""
-                            prod["updated_at"] = now_iso()
+                            update_product(db, prod, {"tag_suggestion": ""})
                             save_db(db)
                         st.rerun()
 
+    # =========================================================
+    # 🔁 TAB: Sinónimos de búsqueda
+    # =========================================================
+    with t_syn:
+        st.markdown("### 🔁 Sinónimos de búsqueda")
+        st.caption(
+            "Un grupo por línea, separado por comas (ej: crispetas, palomitas). "
+            "Buscar cualquiera de los términos encuentra productos con los demás."
+        )
+
+        with st.form("admin_synonyms_form", clear_on_submit=False):
+            syn_text = st.text_area(
+                "Grupos de sinónimos",
+                value=format_synonym_lines(get_synonym_groups(db)),
+                height=220,
+            )
+            syn_submitted = st.form_submit_button("💾 Guardar sinónimos", use_container_width=True)
+
+        if syn_submitted:
+            set_synonym_groups(db, parse_synonym_lines(syn_text))
+            # ✅ el índice de búsqueda se re-arma con los nuevos sinónimos
+            bump_catalog_version(db)
+            save_db(db)
+            st.success("Sinónimos actualizados.")
+            st.rerun()
+
+        st.caption(f"Grupos: {len(get_synonym_groups(db))}")
+
     # =========================================================
     # 🗄️ TAB: Backup
     # =========================================================
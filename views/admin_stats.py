@@ -3,6 +3,8 @@ import streamlit as st
 import pandas as pd
 
 from auth.guards import require_role
+from services import trending
+from services.query_cache import RESULTS_CACHE
 
 
 
@@ -68,6 +70,11 @@ def render(db):
     c4.metric("Vistas Perfil", prof_views)
 
     st.caption(f"Búsquedas registradas: {searches}")
+    cs = RESULTS_CACHE.stats()
+    st.caption(
+        f"Caché de resultados (este proceso): {cs['size']}/{cs['maxsize']} entradas · "
+        f"{cs['hits']} aciertos · {cs['misses']} fallos · {cs['hit_rate']:.0%} acierto"
+    )
     st.divider()
 
     products = db.get("products", []) or []
@@ -76,7 +83,7 @@ def render(db):
     prof_map = {p.get("id"): p for p in profiles}
 
     # ==========================
-    # Top productos por vistas
+    # Top productos por vistas (histórico: todos los eventos guardados)
     # ==========================
     st.markdown("### 🔥 Top productos por vistas")
     pv = df[et == "view_product"]
@@ -103,7 +110,7 @@ def render(db):
     st.write("")
 
     # ==========================
-    # Top perfiles por vistas
+    # Top perfiles por vistas (histórico)
     # ==========================
     st.markdown("### ⭐ Top emprendimientos por vistas de perfil")
     fv = df[et == "view_profile"]
@@ -125,6 +132,66 @@ def render(db):
 
         st.dataframe(pd.DataFrame(rows2), use_container_width=True, hide_index=True)
 
+    st.divider()
+
+    # ==========================
+    # Tendencias (contadores con decaimiento; top-N con heap, sin recorrer eventos)
+    # ==========================
+    st.markdown("## 📈 Tendencias (puntaje con decaimiento)")
+    st.caption(
+        "No es un total histórico: cada vista o contacto pierde la mitad de su peso "
+        f"cada {trending.HALF_LIFE_S // 3600} h, así sube lo que se está mirando ahora."
+    )
+
+    st.markdown("### 🔥 Productos en tendencia")
+    hot = trending.top(db, "products", 20)
+    if not hot:
+        st.info("No hay vistas de productos aún.")
+    else:
+        hot_rows = []
+        for pid, score in hot:
+            pr = prod_map.get(pid) or {}
+            prof = prof_map.get(pr.get("profile_id")) or {}
+            hot_rows.append({
+                "Producto": pr.get("name", "—"),
+                "Emprendimiento": prof.get("business_name", "—"),
+                "Categoría": pr.get("category", "—"),
+                "Puntaje": round(score, 2),
+            })
+
+        st.dataframe(pd.DataFrame(hot_rows), use_container_width=True, hide_index=True)
+
+    st.write("")
+
+    st.markdown("### ⭐ Emprendimientos en tendencia")
+    hot2 = trending.top(db, "profiles", 20)
+    if not hot2:
+        st.info("No hay vistas de perfiles aún.")
+    else:
+        hot_rows2 = []
+        for pid, score in hot2:
+            pr = prof_map.get(pid) or {}
+            hot_rows2.append({
+                "Emprendimiento": pr.get("business_name", "—"),
+                "Ciudad": pr.get("city", "—"),
+                "Puntaje": round(score, 2),
+            })
+
+        st.dataframe(pd.DataFrame(hot_rows2), use_container_width=True, hide_index=True)
+
+    st.write("")
+
+    st.markdown("### 🔎 Búsquedas en tendencia")
+    hot3 = trending.top(db, "queries", 20)
+    if not hot3:
+        st.info("No hay búsquedas registradas aún.")
+    else:
+        st.dataframe(
+            pd.DataFrame([{"Búsqueda": q, "Puntaje": round(score, 2)} for q, score in hot3]),
+            use_container_width=True,
+            hide_index=True,
+        )
+
     st.write("")
     with st.expander("Ver eventos (raw)"):
         # orden si existe ts, si no, deja tal cual
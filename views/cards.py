@@ -0,0 +1,78 @@
+from __future__ import annotations
+import streamlit as st
+
+from services.catalog import format_price
+from services.validators import safe_html, safe_html_multiline, safe_text
+from views.router import goto
+
+
+def _thumb_style(url: str) -> str:
+    url = (url or "").strip()
+    if not url:
+        return ""
+    # escapa la URL para que no rompa el style si trae comillas, paréntesis, etc.
+    return f"background-image:url('{safe_html(url, 500)}');"
+
+
+def product_card_html(p: dict, prof: dict, footer: str = "Publicado") -> str:
+    """
+    HTML completo de una card de producto (sin saltos ni sangría: el markdown
+    no lo confunde con un bloque de código). Una card = un solo st.markdown.
+    """
+    raw_desc = p.get("description", "") or ""
+    desc = safe_text(raw_desc, 110)
+    if len(raw_desc) > 110:
+        desc += "…"
+    photos = [u for u in (p.get("photo_urls") or []) if (u or "").strip()]
+
+    return (
+        '<div class="card">'
+        f'<div class="thumb" style="{_thumb_style(photos[0] if photos else "")}"><span>{safe_html(prof.get("business_name") or "Emprendimiento", 40)}</span></div>'
+        f'<div class="title">{safe_html(p.get("name", ""), 70)}</div>'
+        '<div class="row">'
+        f'<span class="badge">{safe_html(p.get("category", "—"), 30)}</span>'
+        f'<span class="price">{safe_html(format_price(p), 60)}</span>'
+        '</div>'
+        '<div class="divider"></div>'
+        f'<div class="small">{safe_html_multiline(desc, 200)}</div>'
+        '<div class="row" style="margin-top:10px;">'
+        f'<span class="badge badge2">{safe_html(prof.get("city") or "—", 30)}</span>'
+        f'<span class="small">{safe_html(footer, 30)}</span>'
+        '</div>'
+        '</div>'
+    )
+
+
+def profile_card_html(prof: dict) -> str:
+    """Card de emprendimiento del directorio (mismo esquema que product_card_html)."""
+    cats = "".join(f'<span class="badge">{safe_html(c, 30)}</span>' for c in (prof.get("categories") or [])[:3])
+    desc_html = safe_html_multiline(safe_text(prof.get("short_desc") or "", 140), 200)
+    return (
+        '<div class="card">'
+        f'<div class="thumb" style="{_thumb_style(prof.get("logo_url") or "")}"></div>'
+        f'<div class="title">{safe_html(prof.get("business_name") or "Emprendimiento", 70)}</div>'
+        f'<div class="row">{cats}</div>'
+        '<div class="divider"></div>'
+        f'<div class="small">{desc_html}</div>'
+        '<div class="row" style="margin-top:10px;">'
+        f'<span class="badge badge2">{safe_html(prof.get("city") or "—", 30)}</span>'
+        '</div>'
+        '</div>'
+    )
+
+
+def render_product_grid(items: list[dict], key_prefix: str, footer: str = "Publicado", n_cols: int = 3) -> None:
+    """
+    Grilla de cards: una card = un st.markdown + su botón "Ver" (sin divs de
+    apertura/cierre sueltos). El botón navega con goto (query params +
+    st.rerun) y no con un <a href>: recargar la página abriría una sesión
+    nueva (otro anon_id, login y favoritos de visitante perdidos, vistas
+    contadas de nuevo).
+    """
+    for i in range(0, len(items), n_cols):
+        cols = st.columns(n_cols, gap="medium")
+        for col, p in zip(cols, items[i:i + n_cols]):
+            with col:
+                st.markdown(product_card_html(p, p.get("_profile") or {}, footer), unsafe_allow_html=True)
+                if st.button("👁️ Ver", key=f"{key_prefix}_{p['id']}", use_container_width=True):
+                    goto("product_detail", selected_product_id=p["id"])
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import streamlit as st
+
+from services.profile_index import SORTS, profile_facet_counts, search_profiles
+from views.cards import profile_card_html
+from views.router import goto
+
+
+PAGE_SIZE = 12  # 3 cols x 4 filas
+
+
+def render(db):
+    st.markdown("## 🏪 Emprendimientos")
+    st.markdown('<div class="muted">Busca negocios locales por nombre, categoría o ciudad.</div>', unsafe_allow_html=True)
+    st.write("")
+
+    st.session_state.setdefault("dir_q", "")
+    st.session_state.setdefault("dir_cat", "Todas")
+    st.session_state.setdefault("dir_city", "Todas")
+    st.session_state.setdefault("dir_sort", "Relevancia")
+    st.session_state.setdefault("dir_page", 1)
+    st.session_state.setdefault("dir_sig", "")
+
+    # -----------------------------
+    # Filtros (conteos desde el índice de perfiles)
+    # -----------------------------
+    f1, f2, f3, f4 = st.columns([2.2, 1.2, 1.2, 1.1])
+    with f1:
+        q = st.text_input("Buscar", key="dir_q", placeholder="Ej: café, repostería, Bogotá…")
+
+    # conteos con la búsqueda y los filtros actuales
+    counts = profile_facet_counts(db, q, st.session_state["dir_cat"], st.session_state["dir_city"])
+    all_cats = sorted(set(counts["category"]) | ({st.session_state["dir_cat"]} - {"Todas"}))
+    all_cities = sorted(set(counts["city"]) - {""} | ({st.session_state["dir_city"]} - {"Todas"}))
+
+    def _fmt(dim: str):
+        def _f(v: str) -> str:
+            return v if v == "Todas" else f"{v} ({counts[dim].get(v, 0)})"
+        return _f
+
+    with f2:
+        category = st.selectbox("Categoría", ["Todas"] + all_cats, key="dir_cat", format_func=_fmt("category"))
+    with f3:
+        city = st.selectbox("Ciudad", ["Todas"] + all_cities, key="dir_city", format_func=_fmt("city"))
+    with f4:
+        sort_by = st.selectbox("Ordenar", list(SORTS), key="dir_sort")
+
+    # ✅ reset de página cuando cambian filtros/búsqueda
+    sig = f"{q}|{category}|{city}|{sort_by}"
+    if st.session_state["dir_sig"] != sig:
+        st.session_state["dir_sig"] = sig
+        st.session_state["dir_page"] = 1
+
+    res = search_profiles(db, q, category, city, sort_by, page=st.session_state["dir_page"], page_size=PAGE_SIZE)
+    st.markdown(f'<div class="muted">{res["total"]} emprendimiento(s)</div>', unsafe_allow_html=True)
+    st.write("")
+
+    if not res["total"]:
+        st.info("No hay emprendimientos con esos filtros.")
+        return
+
+    profiles_by_id = {p.get("id"): p for p in (db.get("profiles", []) or [])}
+    items = [profiles_by_id[pid] for pid in res["ids"] if pid in profiles_by_id]
+
+    # -----------------------------
+    # Grilla (3 columnas)
+    # -----------------------------
+    n_cols = 3
+    for i in range(0, len(items), n_cols):
+        cols = st.columns(n_cols, gap="medium")
+        for col, prof in zip(cols, items[i:i + n_cols]):
+            with col:
+                # ✅ una card = un markdown + su botón (views/cards.py)
+                st.markdown(profile_card_html(prof), unsafe_allow_html=True)
+                if st.button("👁️ Ver perfil", key=f"dir_view_{prof['id']}", use_container_width=True):
+                    goto("public_profile", selected_profile_id=prof["id"])
+
+    # -----------------------------
+    # Paginación
+    # -----------------------------
+    if res["pages"] > 1:
+        st.write("")
+        p1, p2, p3 = st.columns([1, 1.2, 1])
+        with p1:
+            if st.button("◀ Anterior", disabled=res["page"] <= 1, use_container_width=True, key="dir_prev"):
+                st.session_state["dir_page"] = res["page"] - 1
+                st.rerun()
+        with p2:
+            st.markdown(
+                f'<div class="muted" style="text-align:center;">Página {res["page"]} de {res["pages"]}</div>',
+                unsafe_allow_html=True,
+            )
+        with p3:
+            if st.button("Siguiente ▶", disabled=res["page"] >= res["pages"], use_container_width=True, key="dir_next"):
+                st.session_state["dir_page"] = res["page"] + 1
+                st.rerun()
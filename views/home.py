@@ -1,26 +1,67 @@
 from __future__ import annotations
 import streamlit as st
 
-from services.catalog import filter_products, format_price
+from services.catalog import cached_search_page, facet_counts, products_by_ids, search_page, sidebar_options
+from services.autocomplete import did_you_mean, suggest
+from views.cards import product_card_html, render_product_grid
 from views.router import goto
 from services.favorites import is_favorite, toggle_favorite, list_favorites
 from services.featured import get_featured_products
-from services.validators import safe_text, safe_html, safe_html_multiline
+from services.saved_searches import delete_search, mark_read, pending_notifications, save_search, search_matches, user_searches
+from services.trending import trending_product_ids
+from services.validators import safe_text, safe_html
+from services.text import normalize_query
 
 
 
 from services.analytics import log_view_home, log_search
-from db.repo_json import save_db
+from db.repo_json import catalog_version, save_db
 from auth.session import get_user
 
 
 PAGE_STEP = 9  # 3 cols x 3 filas
+TRENDING_N = 6  # 3 cols x 2 filas
 
 
 def _sig(q: str, category: str, city: str, tag: str, price_range: tuple[int, int], sort_by: str) -> str:
     return f"{q}|{category}|{city}|{tag}|{price_range[0]}-{price_range[1]}|{sort_by}"
 
 
+def _render_explain(db, results: list[dict], q: str, category: str, city: str, tag: str,
+                    price_range: tuple[int, int], sort_by: str) -> None:
+    """Modo explain (solo admin, ?explain=1): etapas, candidatos y puntajes de lo cargado."""
+    ex: dict = {}
+    search_page(db, q, category, city, tag, price_range, sort_by, page_size=max(len(results), PAGE_STEP), explain=ex)
+
+    with st.expander("🔬 Explain de la búsqueda (admin)", expanded=True):
+        st.caption(
+            f"Motor: {ex.get('motor')} · Orden: {ex.get('orden')} · "
+            f"Total: {ex.get('total_ms', 0)} ms · Resultados: {ex.get('resultados', 0)}"
+        )
+        if ex.get("fuzzy"):
+            st.caption(f"Búsqueda aproximada activa → términos de ranking: {ex['fuzzy']}")
+        st.dataframe(ex.get("etapas") or [], use_container_width=True, hide_index=True)
+
+        scores = ex.get("puntajes") or {}
+        if scores:
+            rows = []
+            for p in results:
+                sc = scores.get(p.get("id"))
+                if not sc:
+                    continue
+                rows.append({
+                    "Producto": p.get("name", "—"),
+                    "BM25": sc["total"],
+                    "Popularidad": sc.get("popularidad", 0.0),
+                    "Final": sc.get("final", sc["total"]),
+                    "Detalle": " · ".join(
+                        f"{t['termino']}→{t['token'] or '∅'} idf={t['idf']} {t['campos']} = {t['puntaje']}"
+                        for t in sc["terminos"]
+                    ),
+                })
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+
+
 def render(db):
     st.markdown("## Descubre productos y servicios locales")
     st.markdown('<div class="muted">Busca productos y servicios de emprendedores locales.</div>', unsafe_allow_html=True)
@@ -31,7 +72,7 @@ def render(db):
     # -----------------------------
     st.session_state.setdefault("global_q", "")
     st.session_state.setdefault("global_q_draft", "")
-    st.session_state.setdefault("home_limit", PAGE_STEP)
+    st.session_state.setdefault("home_page", None)  # ids cargados + cursor (paginación)
     st.session_state.setdefault("home_sig", "")
 
     # ✅ 1) Track view_home (dedupe por sesión)
@@ -41,30 +82,52 @@ def render(db):
         save_db(db)
 
 
+    # ✅ Sugerencia elegida en el rerun anterior (el widget aún no existe aquí)
+    picked = st.session_state.pop("_home_q_pick", None)
+    if picked is not None:
+        st.session_state["global_q_input_draft"] = picked
+
     # Buscador superior centrado + botones
     _, mid, _ = st.columns([1, 2.5, 1])
     with mid:
         q_draft = st.text_input(
             "Buscar",
             value=st.session_state["global_q_draft"],
-            placeholder="Ej: crispetas, galletas, brownies, mantenimiento…",
+            placeholder="Ej: crispetas, brownies, mantenimiento… o categoria:Comida precio<30000 tag:regalo",
             label_visibility="collapsed",
             key="global_q_input_draft",
         )
         st.session_state["global_q_draft"] = q_draft
 
-        b1, b2 = st.columns([1, 1])
+        # Autocompletado (lookup por prefijo precalculado, por cada cambio del borrador)
+        draft_n = (q_draft or "").strip()
+        sugg = suggest(db, draft_n) if draft_n and draft_n != st.session_state.get("global_q", "") else []
+        if sugg:
+            s_cols = st.columns(len(sugg))
+            for i, (s_col, label) in enumerate(zip(s_cols, sugg)):
+                with s_col:
+                    if st.button(label, key=f"home_sugg_{i}", use_container_width=True):
+                        st.session_state["_home_q_pick"] = label
+                        st.session_state["global_q_draft"] = label
+                        st.session_state["global_q"] = label
+                        st.session_state["home_page"] = None  # ✅ reset
+                        st.rerun()
+
+        b1, b2, b3 = st.columns([1, 1, 1])
         with b1:
             if st.button("Buscar", use_container_width=True):
                 st.session_state["global_q"] = (st.session_state["global_q_draft"] or "").strip()
-                st.session_state["home_limit"] = PAGE_STEP  # ✅ reset
+                st.session_state["home_page"] = None  # ✅ reset
                 st.rerun()
         with b2:
             if st.button("Mostrar todo", use_container_width=True):
                 st.session_state["global_q"] = ""
                 st.session_state["global_q_draft"] = ""
-                st.session_state["home_limit"] = PAGE_STEP  # ✅ reset
+                st.session_state["home_page"] = None  # ✅ reset
                 st.rerun()
+        with b3:
+            if st.button("🏪 Emprendimientos", use_container_width=True, help="Directorio de negocios"):
+                goto("directory")
 
     st.write("")
     q = st.session_state.get("global_q", "")
@@ -85,23 +148,11 @@ def render(db):
     # -----------------------------
     st.sidebar.header("Filtros")
 
-    all_categories = sorted({
-        (p.get("category") or "").strip()
-        for p in db.get("products", [])
-        if (p.get("status") or "").upper() == "PUBLISHED" and (p.get("category") or "").strip()
-    })
-    all_cities = sorted({
-        pr.get("city", "") for pr in db.get("profiles", [])
-        if pr.get("is_approved") and pr.get("city")
-    })
-    all_tags = sorted({
-        t
-        for p in db.get("products", [])
-        if (p.get("status") or "").upper() == "PUBLISHED"
-        for t in (p.get("tags") or [])
-        if (t or "").strip()
-    })
-
+    # Listas de opciones y precios: precalculados por versión de catálogo
+    options = sidebar_options(db)
+    all_categories = options["categories"]
+    all_cities = options["cities"]
+    all_tags = options["tags"]
 
     # Keys estables
     st.session_state.setdefault("home_cat", "Todas")
@@ -109,17 +160,28 @@ def render(db):
     st.session_state.setdefault("home_tag", "Todos")
     st.session_state.setdefault("home_sort", "Relevancia")
 
-    category = st.sidebar.selectbox("Categoría", ["Todas"] + all_categories, key="home_cat")
-    city = st.sidebar.selectbox("Ciudad", ["Todas"] + all_cities, key="home_city")
-    tag = st.sidebar.selectbox("Etiquetas", ["Todos"] + all_tags, key="home_tag")
-
-    numeric_prices = [
-        p["price_value"] for p in db.get("products", [])
-        if p.get("status") == "PUBLISHED" and isinstance(p.get("price_value"), (int, float))
-    ]
-    if numeric_prices:
-        min_price = int(min(numeric_prices))
-        max_price = int(max(numeric_prices))
+    # Conteos por opción para la búsqueda actual (bitsets, sin recorrer productos)
+    counts = facet_counts(
+        db, q,
+        st.session_state["home_cat"], st.session_state["home_city"], st.session_state["home_tag"],
+    )
+
+    def _with_count(dim: str, key_fn=lambda v: v):
+        def _fmt(v: str) -> str:
+            if v in ("Todas", "Todos"):
+                return v
+            return f"{v} ({counts[dim].get(key_fn(v), 0)})"
+        return _fmt
+
+    category = st.sidebar.selectbox("Categoría", ["Todas"] + all_categories, key="home_cat", format_func=_with_count("category"))
+    city = st.sidebar.selectbox("Ciudad", ["Todas"] + all_cities, key="home_city", format_func=_with_count("city"))
+    tag = st.sidebar.selectbox("Etiquetas", ["Todos"] + all_tags, key="home_tag", format_func=_with_count("tag", normalize_query))
+
+    # Precios visibles: resumen del índice de precios (misma versión de catálogo)
+    price_info = options["prices"]
+    if price_info["min"] is not None:
+        min_price = int(price_info["min"])
+        max_price = int(price_info["max"])
         # Key estable
         st.session_state.setdefault("home_price_min", min_price)
         st.session_state.setdefault("home_price_max", max_price)
@@ -135,24 +197,76 @@ def render(db):
             max_value=max_price,
             value=st.session_state.get("home_price_range", (min_price, max_price)),
             key="home_price_range",
+            help=f"La mayoría de precios está entre ${int(price_info['p05']):,} y ${int(price_info['p95']):,}".replace(",", "."),
         )
     else:
         price_range = (0, 10**9)
+    # el rango completo no es un filtro (no se guarda en búsquedas guardadas)
+    price_filter = None if price_info["min"] is None or tuple(price_range) == (min_price, max_price) else tuple(price_range)
 
     sort_by = st.sidebar.selectbox("Ordenar", ["Relevancia", "Más recientes", "Precio ↑", "Precio ↓"], key="home_sort")
 
+    # ✅ Mis búsquedas guardadas (+ avisos pendientes en la bandeja de salida)
+    my_saved = user_searches(db, u["id"]) if u else []
+    if my_saved:
+        pending = pending_notifications(db, u["id"])
+        with st.sidebar.expander(f"🔔 Mis búsquedas guardadas ({len(my_saved)})"):
+            for sv in my_saved:
+                n_new = sum(1 for n in pending if n.get("search_id") == sv["id"])
+                c_lbl, c_open, c_del = st.columns([3, 1, 1])
+                c_lbl.markdown(f"{safe_html(sv.get('label', ''), 60)}" + (f" · <b>{n_new} nuevo(s)</b>" if n_new else ""), unsafe_allow_html=True)
+                if c_open.button("👁️", key=f"saved_open_{sv['id']}", help="Ver coincidencias"):
+                    # ✅ abrir = leído: el contador "nuevo(s)" vuelve a cero
+                    if mark_read(db, u["id"], sv["id"]):
+                        save_db(db)
+                    st.session_state["home_saved_open"] = sv["id"]
+                    st.rerun()
+                if c_del.button("🗑️", key=f"saved_del_{sv['id']}", help="Dejar de seguir"):
+                    delete_search(db, u["id"], sv["id"])
+                    save_db(db)
+                    if st.session_state.get("home_saved_open") == sv["id"]:
+                        st.session_state["home_saved_open"] = None
+                    st.rerun()
+
+    # ✅ Coincidencias de la búsqueda guardada que se abrió en la barra lateral
+    open_id = st.session_state.get("home_saved_open")
+    opened = next((sv for sv in my_saved if sv["id"] == open_id), None)
+    if opened:
+        with st.expander(f"🔔 Coincidencias de «{safe_text(opened.get('label', ''), 60)}»", expanded=True):
+            matched = products_by_ids(db, search_matches(db, u["id"], opened["id"]))
+            if matched:
+                render_product_grid(matched, key_prefix="saved_match")
+            else:
+                st.caption("Todavía no se publicó nada nuevo que coincida.")
+            if st.button("Cerrar", key="saved_close"):
+                st.session_state["home_saved_open"] = None
+                st.rerun()
+
     # -----------------------------
     # Reset automático paginación cuando cambian filtros/busqueda
     # -----------------------------
     current_sig = _sig(q, category, city, tag, price_range, sort_by)
     if st.session_state.get("home_sig", "") != current_sig:
         st.session_state["home_sig"] = current_sig
-        st.session_state["home_limit"] = PAGE_STEP
+        st.session_state["home_page"] = None
 
     # -----------------------------
-    # Resultados filtrados (completo) + corte por paginación
+    # Resultados paginados por cursor (top-k por página, caché LRU por firma + versión)
     # -----------------------------
-    results_all = filter_products(db, q, category, city, tag, price_range, sort_by)
+    def _fetch(cursor: str | None) -> dict:
+        return cached_search_page(
+            db, current_sig, q, category, city, tag, price_range, sort_by,
+            page_size=PAGE_STEP, cursor=cursor,
+        )
+
+    page = st.session_state.get("home_page")
+    version = catalog_version(db)
+    if not page or page.get("version") != version:
+        first = _fetch(None)
+        page = {"version": version, "ids": list(first["ids"]), "total": first["total"], "cursor": first["next_cursor"]}
+        st.session_state["home_page"] = page
+
+    total = int(page["total"])
 
     # ✅ 2) Track search (dedupe por sesión, solo si hay búsqueda o filtros activos)
     # Nota: puedes registrar siempre; yo lo registro cuando hay "intención" (q o filtros ≠ default).
@@ -165,122 +279,82 @@ def render(db):
             "price_range": [int(price_range[0]), int(price_range[1])],
             "sort_by": sort_by,
         }
-        if log_search(db, q=q, filters=filters, results_n=len(results_all), user_id=(u.get("id") if u else None)):
+        if log_search(db, q=q, filters=filters, results_n=total, user_id=(u.get("id") if u else None)):
             save_db(db)
 
     st.markdown("### Resultados")
-    info_txt = f"{len(results_all)} publicación(es) encontrada(s)"
+    info_txt = f"{total} publicación(es) encontrada(s)"
     if q:
         info_txt += f" para “{safe_text(q, 60)}”"
     st.markdown(f'<div class="muted">{info_txt}</div>', unsafe_allow_html=True)
+
+    # ✅ Guardar búsqueda: avisos cuando se publique algo que coincida (services/saved_searches.py)
+    if u and has_intent:
+        if st.button("🔔 Guardar búsqueda", key="home_save_search", help="Te avisamos cuando se publique algo que coincida"):
+            saved = save_search(db, u["id"], q, category, city, tag, price_filter)
+            if saved:
+                save_db(db)
+                st.session_state["_home_saved_msg"] = f"Búsqueda guardada: {saved['label']}"
+                st.rerun()  # ✅ para que aparezca en la barra lateral
+            else:
+                st.info("Agrega texto o algún filtro para guardar la búsqueda.")
+    saved_msg = st.session_state.pop("_home_saved_msg", None)
+    if saved_msg:
+        st.success(saved_msg)
     st.write("")
 
-    if not results_all:
+    if not total:
         st.info("No hay resultados con esos filtros. Prueba otra búsqueda o quita filtros.")
+        # ✅ ¿Quisiste decir? (búsquedas frecuentes / vocabulario del catálogo)
+        fix = did_you_mean(db, q) if q else None
+        if fix:
+            if st.button(f"🔎 ¿Quisiste decir «{fix}»?", key="home_did_you_mean"):
+                st.session_state["_home_q_pick"] = fix
+                st.session_state["global_q_draft"] = fix
+                st.session_state["global_q"] = fix
+                st.session_state["home_page"] = None  # ✅ reset
+                st.rerun()
         return
 
-    limit = int(st.session_state.get("home_limit", PAGE_STEP))
-    results = results_all[:limit]
+    results = products_by_ids(db, page["ids"])
 
     # -----------------------------
     # Grilla real (3 columnas)
     # -----------------------------
-    n_cols = 3
-    for i in range(0, len(results), n_cols):
-        row = results[i:i + n_cols]
-        cols = st.columns(n_cols, gap="medium")
-
-        for col, p in zip(cols, row):
-            prof = p["_profile"]
-            price = format_price(p)
-            badge = p.get("category", "—")
-            city_txt = prof.get("city") or "—"
-            owner = prof.get("business_name") or "Emprendimiento"
-
-            raw_desc = (p.get("description", "") or "")
-            desc = safe_text(raw_desc, 110)
-            if len(raw_desc) > 110:
-                desc += "…"
-            desc_html = safe_html_multiline(desc, 200)  # <-- clave
-
-
-            with col:
-                st.markdown('<div class="card-wrap">', unsafe_allow_html=True)
-
-                photos = p.get("photo_urls") or []
-                photos = [u.strip() for u in photos if (u or "").strip()]
-                thumb_url = photos[0] if photos else ""
-                thumb_style = ""
-                if thumb_url:
-                    # escapa la URL para que no rompa el style si trae comillas, paréntesis, etc.
-                    thumb_style = f"background-image:url('{safe_html(thumb_url, 500)}');"
-
-                st.markdown(
-                    f"""
-                    <div class="card">
-                    <div class="thumb" style="{thumb_style}">
-                        <span>{safe_html(owner, 40)}</span>
-                    </div>
-
-                    <div class="title">{safe_html(p.get("name",""), 70)}</div>
-
-                    <div class="row">
-                        <span class="badge">{safe_html(badge, 30)}</span>
-                        <span class="price">{safe_html(price, 60)}</span>
-                    </div>
-
-                    <div class="divider"></div>
-
-                    <div class="small">{desc_html}</div>
-
-                    <div class="row" style="margin-top:10px;">
-                        <span class="badge badge2">{safe_html(city_txt, 30)}</span>
-                        <span class="small">Publicado</span>
-                    </div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-
-
-                st.markdown('<div class="card-actions">', unsafe_allow_html=True)
-                 
-                #b1,  b3 = st.columns([0.9, 0.1])
-
-                #with b1:
-                st.markdown('<div class="btn-view">', unsafe_allow_html=True)
-                if st.button("👁️ Ver", key=f"view_{p['id']}", use_container_width=True):
-                    goto("product_detail", selected_product_id=p["id"])
-                st.markdown('</div>', unsafe_allow_html=True)
-
-                #with b2:
-                #    st.markdown('<div class="btn-ico">', unsafe_allow_html=True)
-                #    if st.button("👤", key=f"biz_{p['id']}", use_container_width=True, help="Ver emprendimiento"):
-                #        goto("public_profile", selected_profile_id=prof["id"])
-                 #   st.markdown('</div>', unsafe_allow_html=True)
-
-                #with b3:
-                #    st.markdown('<div class="btn-fav">', unsafe_allow_html=True)
-                #    fav = is_favorite(db, p["id"])
-                #    if st.button("❤️" if fav else "♡", key=f"fav_{p['id']}", use_container_width=True, help="Guardar en favoritos"):
-                #        toggle_favorite(db, p["id"])
-                #        st.rerun()
-                #    st.markdown('</div>', unsafe_allow_html=True)
-                
-                st.markdown('</div>', unsafe_allow_html=True)
-                st.markdown('</div>', unsafe_allow_html=True)
+    # ✅ una card = un markdown + su botón (views/cards.py)
+    render_product_grid(results, key_prefix="view")
 
     # -----------------------------
     # Cargar más
     # -----------------------------
-    if len(results_all) > len(results):
+    if page.get("cursor"):
         st.write("")
         _, mid_btn, _ = st.columns([1, 1.2, 1])
         with mid_btn:
-            if st.button(f"➕ Cargar más ({len(results)} / {len(results_all)})", use_container_width=True):
-                st.session_state["home_limit"] = min(len(results_all), limit + PAGE_STEP)
+            if st.button(f"➕ Cargar más ({len(page['ids'])} / {total})", use_container_width=True):
+                nxt = _fetch(page["cursor"])
+                page["ids"] = page["ids"] + list(nxt["ids"])
+                page["cursor"] = nxt["next_cursor"]
+                st.session_state["home_page"] = page
                 st.rerun()
 
+    # ✅ Explain (admin + ?explain=1): por qué salen estos resultados y cuánto tardó cada etapa
+    if (u or {}).get("role") == "ADMIN" and st.query_params.get("explain") == "1":
+        st.write("")
+        _render_explain(db, results, q, category, city, tag, price_range, sort_by)
+
+    # ============================
+    # 📈 Tendencias (contadores con decaimiento, top-N con heap)
+    # ============================
+    trend = products_by_ids(db, trending_product_ids(db, TRENDING_N))
+    if trend:
+        st.divider()
+        st.markdown("### 📈 Tendencias")
+        st.markdown('<div class="muted">Lo más visto y contactado en los últimos días.</div>', unsafe_allow_html=True)
+        st.write("")
+
+        render_product_grid(trend, key_prefix="trend_view")
+
     # ============================
     # ⭐ Destacados (si existen)
     # ============================
@@ -295,88 +369,23 @@ def render(db):
             st.markdown("### ⭐ Destacados")
             st.write("")
 
+            profiles_by_id = {x.get("id"): x for x in db.get("profiles", []) or []}
+            feat = [{**p, "_profile": profiles_by_id.get(p.get("profile_id")) or {}} for p in feat]
+
             n_cols = 3
             for i in range(0, len(feat), n_cols):
-                row = feat[i:i+n_cols]
                 cols = st.columns(n_cols, gap="medium")
-                for col, p in zip(cols, row):
-                    prof = next((x for x in db.get("profiles", []) if x.get("id") == p.get("profile_id")), {}) or {}
-                    price = format_price(p)
-                    badge = p.get("category", "—")
-                    city_txt = prof.get("city") or "—"
-                    owner = prof.get("business_name") or "Emprendimiento"
-
-                    raw_desc = (p.get("description", "") or "")
-                    desc = safe_text(raw_desc, 110)
-                    if len(raw_desc) > 110:
-                        desc += "…"
-                    desc_html = safe_html_multiline(desc, 200)  # <-- clave
-
-
+                for col, p in zip(cols, feat[i:i + n_cols]):
+                    prof = p["_profile"]
                     with col:
-                        st.markdown('<div class="card-wrap">', unsafe_allow_html=True)
-
-                        photos = p.get("photo_urls") or []
-                        photos = [u.strip() for u in photos if (u or "").strip()]
-                        thumb_url = photos[0] if photos else ""
-                        thumb_style = ""
-                        if thumb_url:
-                            # escapa la URL para que no rompa el style si trae comillas, paréntesis, etc.
-                            thumb_style = f"background-image:url('{safe_html(thumb_url, 500)}');"
-
-                        st.markdown(
-                            f"""
-                            <div class="card">
-                            <div class="thumb" style="{thumb_style}">
-                                <span>{safe_html(owner, 40)}</span>
-                            </div>
-
-                            <div class="title">{safe_html(p.get("name",""), 70)}</div>
-
-                            <div class="row">
-                                <span class="badge">{safe_html(badge, 30)}</span>
-                                <span class="price">{safe_html(price, 60)}</span>
-                            </div>
-
-                            <div class="divider"></div>
-
-                            <div class="small">{desc_html}</div>
-
-                            <div class="row" style="margin-top:10px;">
-                                <span class="badge badge2">{safe_html(city_txt, 30)}</span>
-                                <span class="small">Publicado</span>
-                            </div>
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
-
-
-                        st.markdown('<div class="card-actions"><div class="actions-3">', unsafe_allow_html=True)
+                        st.markdown(product_card_html(p, prof), unsafe_allow_html=True)
                         b1, b2 = st.columns([1.6, 0.5], gap="small")
-
                         with b1:
-                            st.markdown('<div class="btn-view">', unsafe_allow_html=True)
                             if st.button("👁️ Ver", key=f"feat_view_{p['id']}", use_container_width=True):
                                 goto("product_detail", selected_product_id=p["id"])
-                            st.markdown('</div>', unsafe_allow_html=True)
-
                         with b2:
-                            st.markdown('<div class="btn-ico">', unsafe_allow_html=True)
                             if st.button("👤", key=f"feat_biz_{p['id']}", use_container_width=True, help="Ver emprendimiento"):
                                 goto("public_profile", selected_profile_id=prof.get("id"))
-                            st.markdown('</div>', unsafe_allow_html=True)
-
-                        #with b3:
-                        #    st.markdown('<div class="btn-fav">', unsafe_allow_html=True)
-                        #    fav = is_favorite(db, p["id"])
-                        #    if st.button("❤️" if fav else "♡", key=f"feat_fav_{p['id']}", use_container_width=True):
-                        #        toggle_favorite(db, p["id"])
-                        #        st.rerun()
-                        #    st.markdown('</div>', unsafe_allow_html=True)
-
-                        st.markdown("</div></div>", unsafe_allow_html=True)
-                        st.markdown('</div>', unsafe_allow_html=True)
 
             st.write("")
             st.divider()
@@ -3,10 +3,11 @@ from __future__ import annotations
 import streamlit as st
 import re
 from auth.session import get_user
-from db.repo_json import save_db, new_id, now_iso
+from db.repo_json import save_db, now_iso
 from services.validators import safe_text
 from services.tag_catalog import tags_for_category, list_categories
 from services.limits import can_publish_more, count_published_products, get_publish_limit
+from services.mutations import delete_product, save_product, set_product_status
 
 
 
@@ -337,17 +338,8 @@ def render(db):
                     "updated_at": now,
                 }
 
-                if item:
-                    item.update(payload)
-                else:
-                    db.setdefault("products", []).append({
-                        "id": new_id(),
-                        "owner_user_id": u["id"],
-                        "profile_id": prof["id"],
-                        "created_at": now,
-                        **payload,
-                    })
-
+                # ✅ mutación central: search_norm + versión + evento para los índices
+                save_product(db, payload, item or None, owner_user_id=u["id"], profile_id=prof["id"])
                 save_db(db)
 
                 # ✅ limpiar estado SOLO del form actual
@@ -468,14 +460,12 @@ def render(db):
                         limit_txt = "Ilimitado" if limit == -1 else str(limit)
                         st.warning(f"No puedes publicar más. Límite: {used_now}/{limit_txt}.")
                     else:
-                        p["status"] = "PUBLISHED"
-                        p["updated_at"] = now_iso()
+                        set_product_status(db, p, "PUBLISHED")
                         save_db(db)
                         st.rerun()
                 else:
                     # ✅ pausar siempre permitido
-                    p["status"] = "PAUSED"
-                    p["updated_at"] = now_iso()
+                    set_product_status(db, p, "PAUSED")
                     save_db(db)
                     st.rerun()
 
@@ -495,7 +485,7 @@ def render(db):
 
                 with cA:
                     if st.button("✅ Sí, eliminar", key=f"mp_del_yes_{p['id']}", use_container_width=True):
-                        db["products"] = [x for x in db.get("products", []) if x.get("id") != p["id"]]
+                        delete_product(db, p["id"])
                         save_db(db)
                         st.session_state[confirm_key] = False
                         st.rerun()
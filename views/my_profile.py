@@ -8,6 +8,7 @@ from auth.guards import require_role
 from auth.session import get_user
 from db.repo_json import user_profile, new_id, now_iso, save_db
 from services.validators import safe_text
+from services.mutations import create_profile, update_profile
 from urllib.parse import quote_plus
 
 # ✅ Incluimos Bebidas y filtramos defaults para evitar errores
@@ -102,7 +103,7 @@ def render(db):
             "created_at": now_iso(),
             "updated_at": now_iso(),
         }
-        db.setdefault("profiles", []).append(prof)
+        create_profile(db, prof)
         save_db(db)
 
     
@@ -168,14 +169,15 @@ def render(db):
                 st.error("El nombre del emprendimiento es obligatorio.")
                 st.stop()
 
-            prof["business_name"] = business_name
-            prof["short_desc"] = short_desc
-            prof["long_desc"] = long_desc
-            prof["categories"] = categories
-            prof["city"] = city
-            prof["availability"] = availability
-            prof["updated_at"] = now_iso()
-
+            # ✅ mutación central (search_norm + evento para los índices)
+            update_profile(db, prof, {
+                "business_name": business_name,
+                "short_desc": short_desc,
+                "long_desc": long_desc,
+                "categories": categories,
+                "city": city,
+                "availability": availability,
+            })
             save_db(db)
             st.success("Perfil actualizado.")
             st.rerun()
@@ -216,9 +218,7 @@ def render(db):
                     st.error(e)
                 st.stop()
 
-            prof["logo_url"] = logo_url
-            prof["gallery_urls"] = gallery_urls
-            prof["updated_at"] = now_iso()
+            update_profile(db, prof, {"logo_url": logo_url, "gallery_urls": gallery_urls})
             save_db(db)
             st.success("Imágenes actualizadas.")
             st.rerun()
@@ -306,8 +306,7 @@ def render(db):
                     st.error(e)
                 st.stop()
 
-            prof["links"] = cleaned
-            prof["updated_at"] = now_iso()
+            update_profile(db, prof, {"links": cleaned})
             save_db(db)
             st.success("Enlaces guardados.")
             st.rerun()
@@ -8,7 +8,9 @@ from services.validators import safe_text
 from views.router import goto
 from auth.session import get_user
 from services.analytics import log_view_product
-from services.catalog import format_price
+from services.catalog import format_price, products_by_ids
+from services.related import related_ids
+from views.cards import render_product_grid
 
 from db.repo_json import save_db
 
@@ -238,3 +240,10 @@ def render(db):
     st.markdown("<div class='pd-section-title'>Descripción</div>", unsafe_allow_html=True)
     desc = (p.get("description") or "").strip() or "—"
     st.markdown(f"<div class='pd-desc'>{safe_text(desc, 2000)}</div>", unsafe_allow_html=True)
+
+    # -------- Relacionados (precalculados, lookup O(1)) --------
+    related = [r for r in products_by_ids(db, related_ids(db, p.get("id"))) if _is_public_allowed(db, r)]
+    if related:
+        st.write("")
+        st.markdown("<div class='pd-section-title'>También te puede interesar</div>", unsafe_allow_html=True)
+        render_product_grid(related, key_prefix="pd_rel")
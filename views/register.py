@@ -3,6 +3,7 @@ import streamlit as st
 
 from auth.hashing import hash_password
 from db.repo_json import new_id, now_iso, save_db
+from services.mutations import create_profile
 
 
 def render(db):
@@ -81,8 +82,9 @@ def render(db):
             "must_change_password": False,
         })
 
+        # ✅ Por mutations: emite el evento de cambio (índice de perfiles / directorio al día)
         profile_id = new_id()
-        db.setdefault("profiles", []).append({
+        create_profile(db, {
             "id": profile_id,
             "owner_user_id": user_id,
             "business_name": (business_name or "").strip()[:80],